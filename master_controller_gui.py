@@ -3,20 +3,34 @@ import cv2
 import numpy as np
 import time
 import threading
+import queue
 from PyQt5.QtWidgets import QApplication, QMainWindow, QWidget, QVBoxLayout, QHBoxLayout, QLabel, QPushButton
 from PyQt5.QtCore import QTimer, Qt, pyqtSignal, QObject
 from PyQt5.QtGui import QImage, QPixmap, QFont, QPalette
-import mediapipe as mp
 
 from utils.activity_logger import ActivityLogger
 from utils.ai_feedback import AIFeedback
-from utils.eye_tracking import EyeTracker
+from utils.eye_tracking import EyeTracker, LEFT_EYE_IDX, RIGHT_EYE_IDX
 from utils.yawn_detection import YawnDetector
 from utils.multiple_faces import MultipleFaceDetector
 from utils.face_presence import FacePresenceDetector
 from utils.emergency_wakeup import EmergencyWakeup
+from utils.face_landmarker import create_face_mesh
+from utils.frame_pipeline import FrameGrabber, InferenceThread, open_capture
 
 class AttentivenessMonitor(QMainWindow):
+    # Eyes count as closed below this EAR, mouth as open above this MAR
+    EAR_CLOSED_THRESHOLD = 0.22
+    MAR_OPEN_THRESHOLD = 0.6
+    
+    # Counter update indexed by eye_closed * 2 + mouth_open:
+    # (keep drowsy counter, keep yawn counter). Closed eyes take priority
+    # over yawning; anything else resets both
+    COUNTER_UPDATE = ((0, 0), (0, 1), (1, 0), (1, 0))
+    
+    # Status indexed by (drowsy threshold reached) * 2 + (yawn threshold reached)
+    STATUS_BY_COUNTERS = ("Active", "Yawning", "Drowsy", "Drowsy")
+    
     def __init__(self):
         super().__init__()
         self.setWindowTitle("AI-Based Student Attentiveness Monitoring System")
@@ -24,15 +38,31 @@ class AttentivenessMonitor(QMainWindow):
         
         # Initialize components
         self.cap = None
-        self.timer = QTimer()
-        self.timer.timeout.connect(self.update_frame)
+        self.frame_grabber = None
+        self.inference_thread = None
+        
+        # Label-sized display buffer and the QImage bound to it
+        self._display_buf = None
+        self._qimage = None
         
         # Initialize detection modules 
         self.activity_logger = ActivityLogger()
+        # Flush the log on any exit path, not just the Exit button sequence
+        app = QApplication.instance()
+        if app is not None:
+            app.aboutToQuit.connect(self.activity_logger.close)
         self.ai_feedback = AIFeedback()
+        
+        # Status announcements go through a worker so the frame path never calls into TTS
+        self._speech_requests = queue.Queue()
+        self._last_queued_status = None
+        # Shared by the GUI thread (speak_status) and the request worker
+        self._last_queued_lock = threading.Lock()
+        self._speech_request_thread = threading.Thread(target=self._speech_request_worker, daemon=True)
+        self._speech_request_thread.start()
         self.eye_tracker = EyeTracker()
         self.yawn_detector = YawnDetector()
-        self.multiple_face_detector = MultipleFaceDetector()
+        self.multiple_face_detector = MultipleFaceDetector(detection_interval=3)
         self.face_presence_detector = FacePresenceDetector()
         self.emergency_wakeup = EmergencyWakeup()
         
@@ -62,12 +92,15 @@ class AttentivenessMonitor(QMainWindow):
         # Store original stylesheet for restoration
         self.original_stylesheet = ""
         
-        # MediaPipe face mesh
-        self.mp_face_mesh = mp.solutions.face_mesh
-        self.face_mesh = self.mp_face_mesh.FaceMesh(
-            static_image_mode=False,
-            max_num_faces=5,
-            refine_landmarks=True,
+        # Shutdown sequence state (see close_application)
+        self._closing = False
+        self._close_finished = False
+        
+        # MediaPipe face mesh (GPU FaceLandmarker when models/face_landmarker.task is present)
+        # Only one face is tracked; multiple faces are counted by the face detector
+        self.face_mesh = create_face_mesh(
+            max_num_faces=1,
+            refine_landmarks=False,
             min_detection_confidence=0.5,
             min_tracking_confidence=0.5
         )
@@ -161,6 +194,26 @@ class AttentivenessMonitor(QMainWindow):
         main_layout.addLayout(left_layout, 3)
         main_layout.addLayout(right_layout, 1)
         
+    def speak_status(self, status):
+        """Queue a status announcement, dropping repeats of the one still pending"""
+        with self._last_queued_lock:
+            if status == self._last_queued_status:
+                return
+            self._last_queued_status = status
+            self._speech_requests.put_nowait(status)
+        
+    def _speech_request_worker(self):
+        """Background worker that forwards queued statuses to AIFeedback"""
+        while True:
+            status = self._speech_requests.get()
+            with self._last_queued_lock:
+                if status == self._last_queued_status:
+                    self._last_queued_status = None
+            try:
+                self.ai_feedback.speak_status(status)
+            except Exception as e:
+                print(f"Error forwarding speech request: {e}")
+        
     def handle_emergency_flash(self, color):
         """Handle emergency screen flashing"""
         if color == "red":
@@ -176,35 +229,58 @@ class AttentivenessMonitor(QMainWindow):
             self.emergency_label.setText("EMERGENCY: OFF")
             self.emergency_label.setStyleSheet("color: gray; padding: 10px; border: 2px solid gray; background-color: lightgray;")
         
+    def start_pipeline(self):
+        """Start the capture and inference threads for the opened camera"""
+        self.frame_grabber = FrameGrabber(self.cap)
+        self.inference_thread = InferenceThread(self.frame_grabber, self.face_mesh,
+                                                face_detector=self.multiple_face_detector,
+                                                presence_detector=self.face_presence_detector)
+        self.inference_thread.detection_active = self.detection_active
+        self.inference_thread.frame_ready.connect(self.update_frame)
+        self.frame_grabber.start()
+        self.inference_thread.start()
+        
+    def stop_pipeline(self):
+        """Stop the inference and capture threads"""
+        if self.inference_thread:
+            self.inference_thread.stop()
+            self.inference_thread = None
+        if self.frame_grabber:
+            self.frame_grabber.stop()
+            self.frame_grabber = None
+        
+    def is_pipeline_running(self):
+        return self.inference_thread is not None and self.inference_thread.isRunning()
+        
     def open_camera(self):
-        self.cap = cv2.VideoCapture(0)
+        self.cap = open_capture(0)
         if self.cap.isOpened():
-            self.timer.start(30)  # 30ms refresh rate
+            self.start_pipeline()
             self.open_camera_btn.setEnabled(False)
             self.close_camera_btn.setEnabled(True)
-            self.ai_feedback.speak_status("Camera Opened")
+            self.speak_status("Camera Opened")
             
     def close_camera(self):
         if self.cap:
+            self.stop_pipeline()
             self.cap.release()
-            self.timer.stop()
             self.camera_label.clear()
             self.camera_label.setText("Camera Feed")
             self.open_camera_btn.setEnabled(True)
             self.close_camera_btn.setEnabled(False)
-            self.ai_feedback.speak_status("Camera Closed")
+            self.speak_status("Camera Closed")
             
     def start_detection(self):
         # Check if camera is not opened, then open it automatically
         if not self.cap or not self.cap.isOpened():
             print("Camera not opened. Opening camera automatically...")
-            self.cap = cv2.VideoCapture(0)
+            self.cap = open_capture(0)
             if self.cap.isOpened():
-                self.timer.start(30)  # 30ms refresh rate
+                self.start_pipeline()
                 self.open_camera_btn.setEnabled(False)
                 self.close_camera_btn.setEnabled(True)
-                self.ai_feedback.speak_status("Camera Opened")
-                self.ai_feedback.speak_status("Detection Started")
+                self.speak_status("Camera Opened")
+                self.speak_status("Detection Started")
                 print("Camera opened successfully!")
             else:
                 print("Failed to open camera!")
@@ -214,6 +290,8 @@ class AttentivenessMonitor(QMainWindow):
                 return
         
         self.detection_active = True
+        if self.inference_thread:
+            self.inference_thread.detection_active = True
         self.last_active_time = time.time()
         self.inactive_start_time = None
         self.emergency_triggered = False
@@ -226,6 +304,7 @@ class AttentivenessMonitor(QMainWindow):
         
         # Reset detectors
         self.face_presence_detector.reset()
+        self.multiple_face_detector.reset()
         
         # Reset logger's inactive tracking
         self.activity_logger.reset_inactive_tracking()
@@ -236,17 +315,19 @@ class AttentivenessMonitor(QMainWindow):
         self.start_detection_btn.setEnabled(False)
         self.stop_detection_btn.setEnabled(True)
         
-        self.ai_feedback.speak_status("Detection Started")
+        self.speak_status("Detection Started")
         
         print("Detection started successfully!")
         
     def stop_detection(self):
         self.detection_active = False
+        if self.inference_thread:
+            self.inference_thread.detection_active = False
         
         # Log detection session stop
         self.activity_logger.log_detection_session("stopped")
         
-        self.ai_feedback.speak_status("Detection Stopped")
+        self.speak_status("Detection Stopped")
         
         # Stop emergency protocol safely
         try:
@@ -263,49 +344,57 @@ class AttentivenessMonitor(QMainWindow):
         
         print("Detection stopped successfully!")
         
-    def update_frame(self):
-        if self.cap and self.cap.isOpened():
-            ret, frame = self.cap.read()
-            if ret:
-                frame = cv2.flip(frame, 1)  # Mirror the image
-                
-                if self.detection_active:
-                    frame = self.process_frame(frame)
-                    
-                # Convert frame to Qt format and display
-                rgb_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-                h, w, ch = rgb_frame.shape
-                bytes_per_line = ch * w
-                qt_image = QImage(rgb_frame.data, w, h, bytes_per_line, QImage.Format_RGB888)
+    def update_frame(self, frame, results, face_detections, face_presence_status):
+        """Slot for InferenceThread.frame_ready - runs on the GUI thread"""
+        try:
+            if self.detection_active and results is not None:
+                frame = self.process_frame(frame, results, face_detections, face_presence_status)
                 
-                # Scale image to fit label
-                scaled_pixmap = QPixmap.fromImage(qt_image).scaled(
-                    self.camera_label.size(), Qt.KeepAspectRatio, Qt.SmoothTransformation)
-                self.camera_label.setPixmap(scaled_pixmap)
+            # Scale image to fit label with OpenCV, keeping the aspect ratio
+            h, w = frame.shape[:2]
+            label_size = self.camera_label.contentsRect().size()
+            scale = min(label_size.width() / w, label_size.height() / h)
+            display_size = (max(1, int(w * scale)), max(1, int(h * scale)))
+            
+            # The QImage wraps a persistent BGR buffer (Format_BGR888 needs no
+            # cvtColor) and is only rebuilt when the label is resized
+            if self._display_buf is None or self._display_buf.shape[1::-1] != display_size:
+                self._display_buf = np.empty((display_size[1], display_size[0], 3), dtype=np.uint8)
+                bytes_per_line = 3 * display_size[0]
+                self._qimage = QImage(self._display_buf.data, display_size[0], display_size[1],
+                                      bytes_per_line, QImage.Format_BGR888)
+            cv2.resize(frame, display_size, dst=self._display_buf, interpolation=cv2.INTER_LINEAR)
+            self.camera_label.setPixmap(QPixmap.fromImage(self._qimage))
+        except Exception as e:
+            # Per-frame feature code validates its input instead of catching
+            # everything itself; anything unexpected is reported once here
+            print(f"Error processing frame: {e}")
+        finally:
+            # Let the inference thread hand over the next frame
+            if self.inference_thread:
+                self.inference_thread.frame_consumed.set()
                 
-    def process_frame(self, frame):
-        rgb_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-        results = self.face_mesh.process(rgb_frame)
-        
+    def process_frame(self, frame, results, face_detections=None, face_presence_status=None):
         current_time = time.time()
         
         # Check for multiple faces first
-        if results.multi_face_landmarks and len(results.multi_face_landmarks) > 1:
-            multiple_faces_status = self.multiple_face_detector.check_multiple_faces(frame)
-            if multiple_faces_status:
-                self.update_status(multiple_faces_status)
-                self.handle_inactivity_tracking("Multiple Faces", current_time)
-                if self.current_status != "Multiple Persons Detected":
-                    self.ai_feedback.speak_status("Multiple Persons Detected")
-                frame = self.multiple_face_detector.process_multiple_faces(frame, results.multi_face_landmarks)
-                return frame
+        if face_detections and len(face_detections) > 1:
+            self.update_status("Multiple Persons Detected")
+            self.handle_inactivity_tracking("Multiple Faces", current_time)
+            if self.current_status != "Multiple Persons Detected":
+                self.speak_status("Multiple Persons Detected")
+            frame = self.multiple_face_detector.draw_face_detections(frame, face_detections)
+            return frame
         
         # Check face presence
         if not results.multi_face_landmarks or len(results.multi_face_landmarks) == 0:
-            face_presence_status = self.face_presence_detector.check_face_presence(frame)
+            # Normally computed by the inference thread; only checked here
+            # when the pipeline runs without a presence detector
+            if face_presence_status is None:
+                face_presence_status = self.face_presence_detector.check_face_presence(frame)
             self.handle_inactivity_tracking(face_presence_status, current_time)
             if self.current_status != "Inactive (Face Missing)":
-               self.ai_feedback.speak_status("Face Not Detected")
+               self.speak_status("Face Not Detected")
             self.update_status(face_presence_status)
             return frame
         
@@ -313,12 +402,9 @@ class AttentivenessMonitor(QMainWindow):
         face_landmarks = results.multi_face_landmarks[0]
         h, w = frame.shape[:2]
         
-        # Get landmark coordinates
-        landmarks = []
-        for landmark in face_landmarks.landmark:
-            x = int(landmark.x * w)
-            y = int(landmark.y * h)
-            landmarks.append([x, y])
+        # Get landmark coordinates once as an (N, 2) int32 pixel array,
+        # shared by every feature module below
+        landmarks = EyeTracker.landmarks_from_mediapipe(face_landmarks, w, h)
             
         # Draw face rectangle
         face_box = self.get_face_bounding_box(landmarks)
@@ -340,12 +426,6 @@ class AttentivenessMonitor(QMainWindow):
         # Update counters display (simplified)
         self.counters_label.setText(f"Drowsy: {self.drowsy_counter} | Yawn: {self.yawn_counter}")
         
-        # Draw status on frame
-        cv2.putText(frame, f"EAR: {ear:.3f}", (10, 30), cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 0, 255), 2)
-        cv2.putText(frame, f"MAR: {mar:.3f}", (10, 60), cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 255, 0), 2)
-        cv2.putText(frame, status.upper(), (face_box[0], face_box[1] - 10), 
-                cv2.FONT_HERSHEY_SIMPLEX, 0.8, (0, 255, 0), 2)
-        
         # Draw eye landmarks
         self.draw_eye_landmarks(frame, landmarks)
         
@@ -361,31 +441,15 @@ class AttentivenessMonitor(QMainWindow):
     
     def determine_status_simple(self, ear, mar, current_time):
         """Simplified status determination without head turn detection"""
-        
-        # Check for drowsiness (eyes closed)
-        if ear < 0.22:
-            self.drowsy_counter += 1
-            self.yawn_counter = 0
-        # Check for yawning
-        elif mar > 0.6:
-            self.yawn_counter += 1
-            self.drowsy_counter = 0
-        else:
-            # Reset counters for eye-based detection
-            self.drowsy_counter = 0
-            self.yawn_counter = 0
-        
-        # Priority 1: Drowsiness (highest priority)
-        if self.drowsy_counter >= self.drowsy_threshold:
-            return "Drowsy"
-        
-        # Priority 2: Yawning
-        elif self.yawn_counter >= self.yawn_threshold:
-            return "Yawning"
-        
-        # Active state
-        else:
-            return "Active"
+        keep_drowsy, keep_yawn = self.COUNTER_UPDATE[
+            (ear < self.EAR_CLOSED_THRESHOLD) * 2 + (mar > self.MAR_OPEN_THRESHOLD)
+        ]
+        self.drowsy_counter = (self.drowsy_counter + 1) * keep_drowsy
+        self.yawn_counter = (self.yawn_counter + 1) * keep_yawn
+        
+        # Drowsiness outranks yawning: index = drowsy * 2 + yawning
+        index = (self.drowsy_counter >= self.drowsy_threshold) * 2 + (self.yawn_counter >= self.yawn_threshold)
+        return self.STATUS_BY_COUNTERS[index]
     
     def reset_inactivity_tracking(self):
         """Reset inactivity tracking when user becomes active"""
@@ -403,7 +467,7 @@ class AttentivenessMonitor(QMainWindow):
                 total_inactive_duration, ear=ear, mar=mar
             )
             
-            self.ai_feedback.speak_status("User Active Again")
+            self.speak_status("User Active Again")
         
         self.last_active_time = current_time
         self.inactive_start_time = None
@@ -429,34 +493,24 @@ class AttentivenessMonitor(QMainWindow):
             if inactive_duration >= self.inactivity_threshold and not self.emergency_triggered:
                 self.trigger_emergency()
                 self.emergency_triggered = True
-                self.ai_feedback.speak_status("User Inactive Too Long")
+                self.speak_status("User Inactive Too Long")
         else:
             self.reset_inactivity_tracking()
         
     def get_face_bounding_box(self, landmarks):
-        x_coords = [p[0] for p in landmarks]
-        y_coords = [p[1] for p in landmarks]
-        return [min(x_coords), min(y_coords), max(x_coords), max(y_coords)]
+        """Return [x_min, y_min, x_max, y_max] for an (N, 2) landmark array"""
+        return np.concatenate((landmarks.min(axis=0), landmarks.max(axis=0))).tolist()
         
     def draw_eye_landmarks(self, frame, landmarks):
-        # Left eye landmarks (approximate indices)
-        left_eye_indices = [33, 7, 163, 144, 145, 153, 154, 155, 133, 173, 157, 158, 159, 160, 161, 246]
-        # Right eye landmarks (approximate indices)
-        right_eye_indices = [362, 382, 381, 380, 374, 373, 390, 249, 263, 466, 388, 387, 386, 385, 384, 398]
-        
-        for idx in left_eye_indices:
-            if idx < len(landmarks):
-                cv2.circle(frame, tuple(landmarks[idx]), 2, (0, 255, 0), -1)
-                
-        for idx in right_eye_indices:
-            if idx < len(landmarks):
-                cv2.circle(frame, tuple(landmarks[idx]), 2, (0, 255, 0), -1)
+        """Draw both eye contours with a single polylines call"""
+        eye_contours = [landmarks[LEFT_EYE_IDX], landmarks[RIGHT_EYE_IDX]]
+        cv2.polylines(frame, eye_contours, True, (0, 255, 0), 1)
                 
     def trigger_emergency(self):
         """Trigger emergency wake-up protocol"""
         self.emergency_wakeup.trigger_emergency()
         self.activity_logger.log_event("Emergency", f"User inactive for >{self.inactivity_threshold} seconds")
-        self.ai_feedback.speak_status("Emergency Alert")
+        self.speak_status("Emergency Alert")
         
     def update_status(self, status):
         """Update status with enhanced logging"""
@@ -485,91 +539,111 @@ class AttentivenessMonitor(QMainWindow):
             )
             
             # AI feedback
-            self.ai_feedback.speak_status(status)
+            self.speak_status(status)
             
     def close_application(self):
-     """Properly close the application with voice feedback for each step"""
-     print("Closing application...")
-     
-     # Step 1: Stop detection if it's active
-     if self.detection_active:
-          print("Stopping detection...")
-          self.ai_feedback.speak_status("Stopping Detection")
-          
-          # Wait a moment for voice to play
-          time.sleep(1.5)
-          
-          # Stop detection
-          self.detection_active = False
-          
-          # Log detection session stop
-          self.activity_logger.log_detection_session("stopped")
-          
-          # Stop emergency protocol safely
-          try:
-               if hasattr(self, 'emergency_wakeup') and self.emergency_wakeup:
-                    self.emergency_wakeup.stop_emergency()
-          except Exception as e:
-               print(f"Error stopping emergency during detection stop: {e}")
-               
-          self.emergency_triggered = False
-          print("Detection stopped.")
-     
-     # Step 2: Stop timer if active
-     try:
-          if hasattr(self, 'timer') and self.timer.isActive():
-               self.timer.stop()
-               print("Timer stopped.")
-     except Exception as e:
-          print(f"Error stopping timer: {e}")
-     
-     # Step 3: Close camera if it's open
-     if hasattr(self, 'cap') and self.cap and self.cap.isOpened():
-          print("Closing camera...")
-          self.ai_feedback.speak_status("Camera Closed")
-          
-          # Wait a moment for voice to play
-          time.sleep(1.5)
-          
-          try:
-               self.cap.release()
-               print("Camera closed.")
-          except Exception as e:
-               print(f"Error releasing camera: {e}")
-     
-     # Step 4: Announce final exit
-     print("Exiting application...")
-     self.ai_feedback.speak_status("Exiting Application")
-     
-     # Wait for final voice message
-     time.sleep(2.0)
-     
-     # Step 5: Final cleanup
-     try:
-          if hasattr(self, 'emergency_wakeup') and self.emergency_wakeup:
-               self.emergency_wakeup.cleanup()
-               print("Emergency system cleaned up.")
-     except Exception as e:
-          print(f"Error during emergency cleanup: {e}")
-     
-     # Step 6: Final voice confirmation
-     self.ai_feedback.speak_status("All Operations Stopped")
-     
-     # Small delay for final message
-     time.sleep(1.5)
-     
-     print("Application closed successfully.")
-     self.close()
-
+        """Properly close the application with voice feedback for each step"""
+        if self._closing:
+            return
+        self._closing = True
+        print("Closing application...")
+        
+        # Each step tears down immediately and only waits (via QTimer, not
+        # sleep) before the next announcement so its voice message can play
+        
+        # Step 1: Stop detection if it's active
+        if self.detection_active:
+            print("Stopping detection...")
+            self.speak_status("Stopping Detection")
+            self._close_stop_detection()
+            QTimer.singleShot(1500, self._close_camera_step)
+        else:
+            self._close_camera_step()
+            
+    def _close_stop_detection(self):
+        self.detection_active = False
+        if self.inference_thread:
+            self.inference_thread.detection_active = False
+        
+        # Log detection session stop
+        self.activity_logger.log_detection_session("stopped")
+        
+        # Stop emergency protocol safely
+        try:
+            if hasattr(self, 'emergency_wakeup') and self.emergency_wakeup:
+                self.emergency_wakeup.stop_emergency()
+        except Exception as e:
+            print(f"Error stopping emergency during detection stop: {e}")
+            
+        self.emergency_triggered = False
+        print("Detection stopped.")
+        
+    def _close_camera_step(self):
+        # Step 2: Stop frame pipeline if active
+        try:
+            if self.is_pipeline_running():
+                self.stop_pipeline()
+                print("Frame pipeline stopped.")
+        except Exception as e:
+            print(f"Error stopping frame pipeline: {e}")
+        
+        # Step 3: Close camera if it's open
+        if hasattr(self, 'cap') and self.cap and self.cap.isOpened():
+            print("Closing camera...")
+            self.speak_status("Camera Closed")
+            try:
+                self.cap.release()
+                print("Camera closed.")
+            except Exception as e:
+                print(f"Error releasing camera: {e}")
+            QTimer.singleShot(1500, self._close_exit_step)
+        else:
+            self._close_exit_step()
+            
+    def _close_exit_step(self):
+        # Step 4: Announce final exit
+        print("Exiting application...")
+        self.speak_status("Exiting Application")
+        QTimer.singleShot(2000, self._close_cleanup_step)
+        
+    def _close_cleanup_step(self):
+        # Step 5: Final cleanup
+        try:
+            if hasattr(self, 'emergency_wakeup') and self.emergency_wakeup:
+                self.emergency_wakeup.cleanup()
+                print("Emergency system cleaned up.")
+        except Exception as e:
+            print(f"Error during emergency cleanup: {e}")
+            
+        try:
+            self.activity_logger.close()
+        except Exception as e:
+            print(f"Error closing activity log: {e}")
+        
+        # Step 6: Final voice confirmation
+        self.speak_status("All Operations Stopped")
+        QTimer.singleShot(1500, self._close_finish_step)
+        
+    def _close_finish_step(self):
+        print("Application closed successfully.")
+        self._close_finished = True
+        self.close()
         
     def closeEvent(self, event):
         """Handle window close event"""
+        if self._close_finished:
+            event.accept()
+            return
+            
+        # Keep the window open while the shutdown sequence runs; it calls
+        # close() again once it has finished
+        event.ignore()
         try:
             self.close_application()
-            event.accept()
         except Exception as e:
             print(f"Error during close event: {e}")
             # Force accept the event even if there's an error
+            self._close_finished = True
             event.accept()
             
     def show_log_statistics(self):
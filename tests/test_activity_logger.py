@@ -0,0 +1,42 @@
+import csv
+import math
+import os
+import tempfile
+import unittest
+
+from utils.activity_logger import ActivityLogger, _mille
+
+
+class MilleTest(unittest.TestCase):
+    def test_matches_fixed_point_format(self):
+        # Dense sweep, including every half-way value with 3 decimals in [0, 2)
+        values = [i / 10000 for i in range(20000)]
+        values += [i / 1000 + 0.0005 for i in range(2000)]
+        values += [0.2345, -0.0, -0.3, 12.3456, 1e12]
+        for value in values:
+            self.assertEqual(_mille(value), f"{value:.3f}", value)
+
+    def test_non_finite_values(self):
+        self.assertEqual(_mille(math.nan), "nan")
+        self.assertEqual(_mille(math.inf), "inf")
+        self.assertEqual(_mille(-math.inf), "-inf")
+
+
+class LogEventTest(unittest.TestCase):
+    def test_non_finite_ear_mar_row_is_written(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            logger = ActivityLogger(os.path.join(tmp, "log.csv"))
+            try:
+                logger.log_event("Active", "test", ear_value=math.nan, mar_value=math.inf)
+                logger.flush()
+            finally:
+                logger.close()
+
+            with open(logger.log_file, newline='') as file:
+                header, row = list(csv.reader(file))
+            self.assertEqual(row[header.index('EAR_Value')], "nan")
+            self.assertEqual(row[header.index('MAR_Value')], "inf")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,50 @@
+import unittest
+
+import numpy as np
+
+from utils.eye_tracking import EYE_EAR_IDX, EyeTracker
+
+
+def _replayed_landmarks(frames=40, seed=0):
+    """Face mesh-sized landmark sequence with eyes blinking over time"""
+    rng = np.random.default_rng(seed)
+    base = rng.integers(0, 480, size=(478, 2))
+    sequence = np.repeat(base[None], frames, axis=0)
+    openness = np.abs(np.sin(np.linspace(0, 3 * np.pi, frames))) * 12
+    for eye in EYE_EAR_IDX:
+        outer, top1, top2, inner, bottom2, bottom1 = eye
+        sequence[:, outer] = (200, 240)
+        sequence[:, inner] = (260, 240)
+        sequence[:, [top1, top2], 0] = (220, 240)
+        sequence[:, [bottom1, bottom2], 0] = (220, 240)
+        sequence[:, [top1, top2], 1] = (240 - openness[:, None]).astype(int)
+        sequence[:, [bottom1, bottom2], 1] = (240 + openness[:, None]).astype(int)
+    sequence += rng.integers(-1, 2, size=sequence.shape)
+    return sequence.astype(np.int32)
+
+
+class CalculateEarBatchTest(unittest.TestCase):
+    def test_matches_per_frame_calculate_ear(self):
+        landmarks = _replayed_landmarks()
+        live = EyeTracker()
+        expected = [live.calculate_ear(frame) for frame in landmarks]
+
+        raw, smoothed = EyeTracker().calculate_ear_batch(landmarks)
+
+        self.assertEqual(raw.shape, (len(landmarks),))
+        np.testing.assert_allclose(smoothed, expected, rtol=1e-9)
+
+    def test_does_not_touch_live_state(self):
+        tracker = EyeTracker()
+        tracker.calculate_ear_batch(_replayed_landmarks())
+        self.assertEqual(tracker.last_ear, 0.3)
+        self.assertEqual(tracker._state.ring_count, 0)
+
+    def test_empty_recording(self):
+        raw, smoothed = EyeTracker().calculate_ear_batch(np.empty((0, 478, 2)))
+        self.assertEqual(len(raw), 0)
+        self.assertEqual(len(smoothed), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
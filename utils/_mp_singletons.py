@@ -0,0 +1,73 @@
+import threading
+import cv2
+import mediapipe as mp
+
+_face_detectors = {}
+_registry_lock = threading.Lock()
+
+# BlazeFace runs on a 128x128 input, so larger frames only add resize work
+DETECTION_MAX_SIDE = 320
+
+
+def downscale_for_detection(image, max_side=DETECTION_MAX_SIDE, dst=None):
+    """Shrink image so its longer side is at most max_side (returned as-is if already small)"""
+    h, w = image.shape[:2]
+    scale = max_side / max(h, w)
+    if scale >= 1.0:
+        return image
+    size = (max(1, round(w * scale)), max(1, round(h * scale)))
+    if dst is not None and dst.shape[:2] != (size[1], size[0]):
+        dst = None
+    return cv2.resize(image, size, dst=dst, interpolation=cv2.INTER_AREA)
+
+
+class SharedFaceDetection:
+    """One MediaPipe FaceDetection graph shared by every detector that uses the same settings"""
+
+    def __init__(self, model_selection, min_detection_confidence):
+        self._face_detection = mp.solutions.face_detection.FaceDetection(
+            model_selection=model_selection,
+            min_detection_confidence=min_detection_confidence
+        )
+        # Face counting runs on the inference thread and presence checks on
+        # the GUI thread; a MediaPipe graph must not process two frames at once
+        self._lock = threading.Lock()
+        self._cached_frame_id = None
+        self._cached_results = None
+        self._small_buf = None
+
+    def process(self, rgb_image, frame_id=None):
+        """
+        Run face detection, reusing the result when this frame was already processed.
+        
+        Args:
+            rgb_image (numpy.ndarray): RGB image
+            frame_id (int): Identifier of the frame, so every detector working on
+                the same frame shares one inference. id() of the image cannot be
+                used because frame buffers are reused from frame to frame
+            
+        Returns:
+            MediaPipe face detection results
+        """
+        with self._lock:
+            if frame_id is not None and frame_id == self._cached_frame_id:
+                return self._cached_results
+            # Detections are relative coordinates, so they still map onto
+            # the full-size frame for drawing
+            small_image = downscale_for_detection(rgb_image, dst=self._small_buf)
+            if small_image is not rgb_image:
+                self._small_buf = small_image
+            results = self._face_detection.process(small_image)
+            self._cached_frame_id = frame_id
+            self._cached_results = results
+            return results
+
+
+def get_face_detector(model_selection=0, min_detection_confidence=0.5):
+    """Return the shared face detection graph for these settings, creating it on first use"""
+    key = (model_selection, min_detection_confidence)
+    with _registry_lock:
+        detector = _face_detectors.get(key)
+        if detector is None:
+            detector = _face_detectors[key] = SharedFaceDetection(*key)
+        return detector
@@ -0,0 +1,197 @@
+import hashlib
+import os
+import threading
+import time
+import wave
+import pygame
+import pyttsx3
+
+# Fixed phrases are rendered once to WAV files here and played back with
+# pygame instead of being synthesised live every time
+CACHE_DIR = os.path.join("cache", "tts")
+
+_engine = None
+_default_voice = None
+_init_lock = threading.Lock()
+
+# pyttsx3 engines are not thread-safe: say/runAndWait from two threads
+# races for the driver's run loop, so every utterance goes through this lock
+_speech_lock = threading.Lock()
+
+# Who the engine is currently speaking for. _speech_lock is held for the
+# whole runAndWait, so stop() cannot wait on it; this lock only guards the
+# owner and the engine.stop() call
+_owner_lock = threading.Lock()
+_current_owner = None
+_RENDERING = object()  # Owner while saving to the WAV cache; never stoppable
+
+_sounds = {}
+
+
+def get_engine():
+    """Return the process-wide pyttsx3 engine, creating it on first use"""
+    global _engine, _default_voice
+    with _init_lock:
+        if _engine is None:
+            _engine = pyttsx3.init()
+            _default_voice = _engine.getProperty('voice')
+        return _engine
+
+
+def _apply_properties(engine, rate, volume, voice):
+    # Callers use different voices/rates/volumes, so apply them per utterance;
+    # voice None means the engine's default, not whatever was used last
+    engine.setProperty('voice', voice if voice is not None else _default_voice)
+    if rate is not None:
+        engine.setProperty('rate', rate)
+    if volume is not None:
+        engine.setProperty('volume', volume)
+
+
+def _run(engine, owner):
+    """runAndWait on behalf of owner, so only that owner can stop it"""
+    global _current_owner
+    with _owner_lock:
+        _current_owner = owner
+    try:
+        engine.runAndWait()
+    finally:
+        with _owner_lock:
+            _current_owner = None
+
+
+def speak(text, rate=None, volume=None, voice=None, owner=None):
+    """Speak text on the shared engine, blocking until it has been spoken"""
+    engine = get_engine()
+    with _speech_lock:
+        _apply_properties(engine, rate, volume, voice)
+        engine.say(text)
+        _run(engine, owner)
+
+
+def stop(owner):
+    """
+    Stop live speech, but only if it was started by owner.
+    
+    Speech of other users of the shared engine and background cache
+    renders are left alone.
+    
+    Returns:
+        bool: True if owner's speech was stopped
+    """
+    if owner is None or _engine is None:
+        return False
+    with _owner_lock:
+        if _current_owner is not owner:
+            return False
+        _engine.stop()
+        return True
+
+
+def _cache_path(text, rate, volume, voice):
+    key = hashlib.sha1(f"{voice}|{rate}|{volume}|{text}".encode('utf-8')).hexdigest()[:16]
+    return os.path.join(CACHE_DIR, f"tts_{key}.wav")
+
+
+def render(text, rate=None, volume=None, voice=None):
+    """Render text to the WAV cache unless it is already there"""
+    path = _cache_path(text, rate, volume, voice)
+    if os.path.isfile(path):
+        return path
+        
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    # Render to a temporary name so a half-written file is never played
+    partial_path = path[:-len(".wav")] + ".partial.wav"
+    engine = get_engine()
+    with _speech_lock:
+        _apply_properties(engine, rate, volume, voice)
+        engine.save_to_file(text, partial_path)
+        _run(engine, _RENDERING)
+        
+    if _is_complete_wav(partial_path):
+        os.replace(partial_path, path)
+        return path
+    # Never let a truncated render into the permanent cache
+    try:
+        os.remove(partial_path)
+    except OSError:
+        pass
+    return None
+
+
+def _is_complete_wav(path):
+    """True if path is a WAV file whose audio data is as long as its header says"""
+    try:
+        with wave.open(path, 'rb') as wav:
+            n_frames = wav.getnframes()
+            expected = n_frames * wav.getsampwidth() * wav.getnchannels()
+            return n_frames > 0 and len(wav.readframes(n_frames)) == expected
+    except (OSError, EOFError, wave.Error):
+        return False
+
+
+def prerender(texts, rate=None, volume=None, voice=None):
+    """Render texts to the WAV cache on a background thread"""
+    def run():
+        for text in dict.fromkeys(texts):
+            try:
+                render(text, rate, volume, voice)
+            except Exception as e:
+                print(f"Error rendering speech cache: {e}")
+                return
+                
+    threading.Thread(target=run, daemon=True).start()
+
+
+def cached_sound(text, rate=None, volume=None, voice=None):
+    """
+    Get the pre-rendered sound for text.
+    
+    Returns:
+        pygame.mixer.Sound or None: None if the text has not been rendered yet
+    """
+    if not pygame.mixer.get_init():
+        # Sounds from a mixer that has been shut down cannot be played
+        _sounds.clear()
+        return None
+        
+    key = (text, rate, volume, voice)
+    sound = _sounds.get(key)
+    if sound is None:
+        path = _cache_path(text, rate, volume, voice)
+        if not os.path.isfile(path):
+            return None
+        try:
+            sound = pygame.mixer.Sound(path)
+        except Exception as e:
+            print(f"Error loading cached speech: {e}")
+            return None
+        _sounds[key] = sound
+    return sound
+
+
+def release_sounds():
+    """Forget loaded sounds; call before pygame.mixer.quit()"""
+    _sounds.clear()
+
+
+def play(sound, should_stop=None):
+    """Play a sound and block until it finishes or should_stop() returns True"""
+    wait(sound, sound.play(), should_stop)
+
+
+def wait(sound, channel, should_stop=None):
+    """Block while channel plays sound, stopping it early if should_stop() returns True"""
+    while channel is not None and channel.get_busy():
+        if should_stop is not None and should_stop():
+            stop_channel(sound, channel)
+            break
+        time.sleep(0.05)
+
+
+def stop_channel(sound, channel):
+    """Stop channel, but only while it is still playing sound"""
+    # The mixer reuses channels, so once sound has finished the channel may
+    # be playing someone else's audio
+    if channel is not None and channel.get_sound() is sound:
+        channel.stop()
@@ -1,15 +1,78 @@
 import csv
+import math
 import os
+import shutil
+import time
 from datetime import datetime
 import threading
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+def _csv_escape(value):
+    """Quote a CSV field only when it contains a delimiter, quote or newline"""
+    value = str(value)
+    if ',' in value or '"' in value or '\n' in value or '\r' in value:
+        return '"' + value.replace('"', '""') + '"'
+    return value
+
+
+def _mille(value):
+    """Format a value exactly like f'{value:.3f}', through integer thousandths"""
+    scaled = value * 1000
+    # nan / inf, negatives, zero (keeps -0.000) and values too large for the
+    # product to be exact enough all go through the format directly
+    if not 0.0 < scaled < 1e9:
+        return f"{value:.3f}"
+    n = int(scaled)
+    frac = scaled - n
+    if abs(frac - 0.5) < 1e-6:
+        # Near half-way the rounded product can land on either side of the
+        # exact binary value, which is what .3f rounds
+        return f"{value:.3f}"
+    n += frac > 0.5
+    return f"{n // 1000}.{n % 1000:03d}"
+
+
+def _write_all(fd, data):
+    """Write all of data to fd, retrying after partial writes"""
+    data = memoryview(data)
+    while data:
+        data = data[os.write(fd, data):]
+
 
 class ActivityLogger:
+    # Rows buffered for the writer before new events are dropped
+    MAX_PENDING_ROWS = 4096
+    
+    # Statuses considered 'inactive'
+    _INACTIVE = frozenset({
+        "Drowsy", 
+        "Yawning", 
+        "Inactive (Face Missing)", 
+        "Not Awake", 
+        "Multiple Persons Detected",
+        "Inactive"
+    })
+    
     def __init__(self, log_file="attentiveness_log.csv"):
         self.log_file = log_file
         self.lock = threading.Lock()
         self.last_inactive_start = None  
         self.initialize_log_file()
         
+        # Timestamp strings for the last logged second, reused while it lasts
+        self._last_sec = None
+        self._last_ts = self._last_date = self._last_time = ""
+        
+        # Rows are buffered here and written by a single-worker executor
+        # through a raw O_APPEND descriptor, so log_event never blocks on
+        # file I/O and each batch is a single write syscall
+        self._fd = os.open(self.log_file, os.O_WRONLY | os.O_APPEND | os.O_CREAT | getattr(os, 'O_BINARY', 0), 0o644)
+        self._pending = []
+        self._drain_scheduled = False
+        self._closed = False
+        self._io = ThreadPoolExecutor(max_workers=1, thread_name_prefix='log-io')
+        
     def initialize_log_file(self):
         """Initialize the CSV log file with headers if it doesn't exist"""
         file_exists = os.path.isfile(self.log_file)
@@ -29,34 +92,81 @@ class ActivityLogger:
                     'Inactive_Duration'  
                 ])
                 
-    def log_event(self, status, description, duration=0, ear_value=0.0, mar_value=0.0, inactive_duration='-'):
-        """Log an attentiveness event to the CSV file"""
+    def _drain(self):
+        """Write every pending row with a single write call"""
         with self.lock:
-            try:
-                now = datetime.now()
-                timestamp = now.strftime("%Y-%m-%d %H:%M:%S")
-                date_str = now.strftime("%Y-%m-%d")
-                time_str = now.strftime("%H:%M:%S")
-                
-                with open(self.log_file, 'a', newline='') as file:
-                    writer = csv.writer(file)
-                    writer.writerow([
-                        timestamp,
-                        date_str,
-                        time_str,
-                        status,
-                        description,
-                        duration,
-                        f"{ear_value:.3f}",
-                        f"{mar_value:.3f}",
-                        inactive_duration
-                    ])
-                    
-                print(f"[LOG] {timestamp} - {status}: {description}")
+            lines, self._pending = self._pending, []
+            self._drain_scheduled = False
+        if lines:
+            _write_all(self._fd, ''.join(lines).encode('utf-8'))
+            
+    def _report_write_error(self, future):
+        error = future.exception()
+        if error is not None:
+            print(f"Error writing log rows: {error}")
+            
+    def flush(self):
+        """Block until every pending row has been written to the log file"""
+        with self.lock:
+            if self._closed:
+                return
+            future = self._io.submit(self._drain)
+        try:
+            future.result()
+        except Exception as e:
+            print(f"Error writing log rows: {e}")
+            
+    def close(self):
+        """Write any pending rows and shut the writer down"""
+        with self.lock:
+            if self._closed:
+                return
+            self._closed = True
+            self._io.submit(self._drain).add_done_callback(self._report_write_error)
+        self._io.shutdown(wait=True)
+        os.close(self._fd)
                 
-            except Exception as e:
-                print(f"Error logging event: {e}")
+    def _format_now(self):
+        """Return (timestamp, date, time) strings, formatting at most once per second"""
+        sec = int(time.time())
+        if sec != self._last_sec:
+            now = datetime.fromtimestamp(sec)
+            self._last_date = now.strftime("%Y-%m-%d")
+            self._last_time = now.strftime("%H:%M:%S")
+            self._last_ts = f"{self._last_date} {self._last_time}"
+            self._last_sec = sec
+        return self._last_ts, self._last_date, self._last_time
+        
+    def log_event(self, status, description, duration=0, ear_value=0.0, mar_value=0.0, inactive_duration='-'):
+        """Log an attentiveness event to the CSV file"""
+        try:
+            timestamp, date_str, time_str = self._format_now()
+            
+            # Rows are formatted here rather than through csv.writer; only the
+            # free-text fields can ever need quoting
+            line = (
+                f"{timestamp},{date_str},{time_str},{_csv_escape(status)},{_csv_escape(description)},"
+                f"{duration},{_mille(ear_value)},{_mille(mar_value)},{_csv_escape(inactive_duration)}\r\n"
+            )
+            
+            with self.lock:
+                if self._closed:
+                    print(f"Error logging event: logger is closed, dropped {status} event")
+                    return
+                if len(self._pending) >= self.MAX_PENDING_ROWS:
+                    print(f"Error logging event: write buffer full, dropped {status} event")
+                    return
+                self._pending.append(line)
+                # One drain per burst; rows logged meanwhile join that batch
+                if not self._drain_scheduled:
+                    self._drain_scheduled = True
+                    self._io.submit(self._drain).add_done_callback(self._report_write_error)
                 
+            print(f"[LOG] {timestamp} - {status}: {description}")
+            
+        except Exception as e:
+            print(f"Error logging event: {e}")
+            
     def log_status_change(self, old_status, new_status, ear=0.0, mar=0.0, current_time=None):
         """Log a status change event with inactive duration tracking"""
         description = f"Status changed from {old_status} to {new_status}"
@@ -89,15 +199,7 @@ class ActivityLogger:
         
     def _is_inactive_status(self, status):
         """Determine if a status is considered 'inactive'"""
-        inactive_statuses = [
-            "Drowsy", 
-            "Yawning", 
-            "Inactive (Face Missing)", 
-            "Not Awake", 
-            "Multiple Persons Detected",
-            "Inactive"
-        ]
-        return status in inactive_statuses
+        return status in ActivityLogger._INACTIVE
         
     def log_emergency(self, inactive_duration):
         """Log an emergency wake-up event"""
@@ -137,44 +239,65 @@ class ActivityLogger:
     def get_log_stats(self):
         """Get basic statistics from the log file"""
         try:
-            with open(self.log_file, 'r') as file:
-                reader = csv.DictReader(file)
-                rows = list(reader)
-                
-            if not rows:
-                return {"total_events": 0}
-                
-            status_counts = {}
-            total_events = len(rows)
-            inactive_durations = []
+            self.flush()
+            total_events = 0
+            status_counts = Counter()
+            duration_sum = 0.0
+            duration_count = 0
+            min_duration = math.inf
+            max_duration = -math.inf
+            latest_row = None
             
-            for row in rows:
-                status = row['Status']
-                status_counts[status] = status_counts.get(status, 0) + 1
+            # Single streaming pass so memory stays constant as the log grows;
+            # rows are indexed positionally instead of building a dict each
+            with open(self.log_file, 'r', newline='') as file:
+                reader = csv.reader(file)
+                header = next(reader, None)
+                if header is None:
+                    return {"total_events": 0}
+                status_idx = header.index('Status')
+                # Older logs were written without the Inactive_Duration column
+                duration_idx = header.index('Inactive_Duration') if 'Inactive_Duration' in header else len(header)
+                
+                for row in reader:
+                    if not row:
+                        continue
+                    total_events += 1
+                    status_counts[row[status_idx]] += 1
+                    latest_row = row
+                    
+                    # Collect inactive durations for analysis
+                    duration = row[duration_idx] if duration_idx < len(row) else '-'
+                    if duration != '-':
+                        try:
+                            duration = float(duration)
+                        except ValueError:
+                            continue
+                        duration_sum += duration
+                        duration_count += 1
+                        if duration < min_duration:
+                            min_duration = duration
+                        if duration > max_duration:
+                            max_duration = duration
                 
-                # Collect inactive durations for analysis
-                if row.get('Inactive_Duration', '-') != '-':
-                    try:
-                        duration = float(row['Inactive_Duration'])
-                        inactive_durations.append(duration)
-                    except ValueError:
-                        pass
+            if not total_events:
+                return {"total_events": 0}
                         
             # Calculate inactive duration statistics
             inactive_stats = {}
-            if inactive_durations:
+            if duration_count:
                 inactive_stats = {
-                    "total_inactive_periods": len(inactive_durations),
-                    "average_inactive_duration": sum(inactive_durations) / len(inactive_durations),
-                    "max_inactive_duration": max(inactive_durations),
-                    "min_inactive_duration": min(inactive_durations)
+                    "total_inactive_periods": duration_count,
+                    "average_inactive_duration": duration_sum / duration_count,
+                    "max_inactive_duration": max_duration,
+                    "min_inactive_duration": min_duration
                 }
                 
             return {
                 "total_events": total_events,
-                "status_counts": status_counts,
+                "status_counts": dict(status_counts),
                 "inactive_duration_stats": inactive_stats,
-                "latest_entry": rows[-1] if rows else None
+                "latest_entry": dict(zip(header, latest_row))
             }
             
         except Exception as e:
@@ -198,9 +321,22 @@ class ActivityLogger:
             export_file = f"attentiveness_log_export_{timestamp}.csv"
             
         try:
-            with open(self.log_file, 'r') as source:
-                with open(export_file, 'w') as dest:
-                    dest.write(source.read())
+            self.flush()
+            with open(self.log_file, 'rb') as source, open(export_file, 'wb') as dest:
+                try:
+                    # Copy inside the kernel where sendfile supports file-to-file
+                    size = os.fstat(source.fileno()).st_size
+                    offset = 0
+                    while offset < size:
+                        sent = os.sendfile(dest.fileno(), source.fileno(), offset, size - offset)
+                        if sent == 0:
+                            break
+                        offset += sent
+                except (AttributeError, OSError):
+                    source.seek(0)
+                    dest.seek(0)
+                    dest.truncate()
+                    shutil.copyfileobj(source, dest, 1024 * 1024)
             print(f"Logs exported to {export_file}")
             return export_file
         except Exception as e:
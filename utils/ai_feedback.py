@@ -1,18 +1,48 @@
-import pyttsx3
+import itertools
 import threading
-import queue
 import time
+from collections import deque
+import pygame
+from utils._tts import cached_sound, get_engine, play, prerender, speak, stop
 
 class AIFeedback:
+    # Statuses that interrupt ongoing speech
+    _CRITICAL = frozenset({"Emergency", "Not Awake", "Fake Presence", "Drowsy"})
+    
+    EMERGENCY_MESSAGES = (
+        "Wake up! You've been inactive for too long!",
+        "Attention! Please focus on your studies!",
+        "Alert! Student attentiveness required!",
+        "Emergency! Please return to your work!"
+    )
+    
+    # Pending speech cap; beyond it the oldest normal-priority entry is
+    # evicted, high-priority (critical) entries are never dropped
+    MAX_QUEUED_SPEECH = 64
+    
     def __init__(self):
         self.tts_engine = None
-        self.speech_queue = queue.Queue()
+        # Single consumer, so a deque plus an event replaces queue.Queue; the
+        # lock makes eviction from the middle safe against the worker's popleft
+        self.speech_queue = deque()
+        self._queue_lock = threading.Lock()
+        self._has_speech = threading.Event()
         self.is_speaking = False
         self.speech_thread = None
         self.stop_speech = False
         self.last_spoken_status = None
         self.last_speech_time = 0
         self.min_speech_interval = 3.0  
+        # A jittery detector flapping back to the status spoken before the
+        # last one within this window is not announced again, while distinct
+        # back-to-back statuses ("Camera Opened", "Detection Started") still are
+        self.min_any_speech_interval = 0.25
+        self._prev_spoken_status = None
+        
+        # Speech voice, rate and volume, applied per utterance on the shared engine
+        self.speech_voice = None  # Engine default unless initialize_tts finds a better one
+        self.speech_rate = 180  # Words per minute
+        self.speech_volume = 0.9  # Volume level (0.0 to 1.0)
         
         self.initialize_tts()
         self.start_speech_worker()
@@ -99,24 +129,36 @@ class AIFeedback:
             ]
         }
         
+        # Rotate through each status's messages to avoid repetition
+        self._msg_cycles = {status: itertools.cycle(messages) for status, messages in self.status_messages.items()}
+        
+        # The messages are fixed, so render them to WAV once and play them
+        # back from memory; live TTS is only used until a message is cached
+        if self.tts_engine:
+            try:
+                if not pygame.mixer.get_init():
+                    pygame.mixer.init()
+            except Exception as e:
+                print(f"Could not initialize pygame mixer: {e}")
+            fixed_messages = [message for messages in self.status_messages.values() for message in messages]
+            prerender(fixed_messages + list(self.EMERGENCY_MESSAGES), self.speech_rate, self.speech_volume,
+                      self.speech_voice)
+        
     def initialize_tts(self):
         """Initialize the text-to-speech engine"""
         try:
-            self.tts_engine = pyttsx3.init()
+            self.tts_engine = get_engine()
             
             # Configure TTS settings
             voices = self.tts_engine.getProperty('voices')
             if voices:
-                # Try to use a female voice if available
+                # Try to use a female voice if available. It is applied per
+                # utterance, so EmergencyWakeup keeps its own voice
                 for voice in voices:
                     if 'female' in voice.name.lower() or 'zira' in voice.name.lower():
-                        self.tts_engine.setProperty('voice', voice.id)
+                        self.speech_voice = voice.id
                         break
                         
-            # Set speech rate and volume
-            self.tts_engine.setProperty('rate', 180)  # Words per minute
-            self.tts_engine.setProperty('volume', 0.9)  # Volume level (0.0 to 1.0)
-            
             print("TTS engine initialized successfully")
             
         except Exception as e:
@@ -132,27 +174,36 @@ class AIFeedback:
         """Background worker to process speech queue"""
         while not self.stop_speech:
             try:
-                # Get speech request from queue with timeout
-                speech_data = self.speech_queue.get(timeout=1)
+                # Wait for a speech request with timeout
+                if not self._has_speech.wait(timeout=1):
+                    continue
+                try:
+                    with self._queue_lock:
+                        speech_data = self.speech_queue.popleft()
+                except IndexError:
+                    self._has_speech.clear()
+                    # A request may have arrived between popleft and clear
+                    if self.speech_queue:
+                        self._has_speech.set()
+                    continue
                 
                 if speech_data and self.tts_engine:
                     speech_text, priority = speech_data
                     self.is_speaking = True
                     print(f"[AI FEEDBACK] Speaking: {speech_text}")
                     
-                    # Clear any pending speech for high priority messages
-                    if priority == "high":
-                        self.tts_engine.stop()
-                    
-                    self.tts_engine.say(speech_text)
-                    self.tts_engine.runAndWait()
+                    # This worker is the only one speaking for AIFeedback, so by
+                    # now its previous message has finished; high priority only
+                    # means the queue was cleared when the message was queued
+                    sound = cached_sound(speech_text, self.speech_rate, self.speech_volume, self.speech_voice)
+                    if sound is not None:
+                        play(sound, lambda: self.stop_speech)
+                    else:
+                        speak(speech_text, rate=self.speech_rate, volume=self.speech_volume,
+                              voice=self.speech_voice, owner=self)
                     
                     self.is_speaking = False
-                    
-                self.speech_queue.task_done()
                 
-            except queue.Empty:
-                continue
             except Exception as e:
                 print(f"Error in speech worker: {e}")
                 self.is_speaking = False
@@ -163,6 +214,10 @@ class AIFeedback:
             return
             
         current_time = time.time()
+        if (status != self.last_spoken_status and status == self._prev_spoken_status and
+            current_time - self.last_speech_time < self.min_any_speech_interval and
+            status not in AIFeedback._CRITICAL):
+            return
         
         # Check if we should speak (avoid too frequent repetition)
         if (self.last_spoken_status == status and 
@@ -170,66 +225,60 @@ class AIFeedback:
             return
             
         # Don't queue new speech if already speaking, unless it's critical
-        critical_statuses = ["Emergency", "Not Awake", "Fake Presence", "Drowsy"]
-        
-        if self.is_speaking and status not in critical_statuses:
+        if self.is_speaking and status not in AIFeedback._CRITICAL:
             return
             
         # Get appropriate message for status
-        messages = self.status_messages.get(status, [f"Status update: {status}"])
-        
-        # Rotate through messages to avoid repetition
-        if len(messages) > 1:
-            import random
-            message = random.choice(messages)
-        else:
-            message = messages[0]
+        messages = self._msg_cycles.get(status)
+        message = next(messages) if messages is not None else f"Status update: {status}"
         
         # Determine priority
-        priority = "high" if status in critical_statuses else "normal"
+        priority = "high" if status in AIFeedback._CRITICAL else "normal"
         
         # Clear queue for critical messages
         if priority == "high":
             self._clear_speech_queue()
             
         # Add to speech queue
-        try:
-            self.speech_queue.put((message, priority), block=False)
-            self.last_spoken_status = status
-            self.last_speech_time = current_time
-        except queue.Full:
-            pass  # Queue is full, skip this message
+        self._enqueue_speech(message, priority)
+        if status != self.last_spoken_status:
+            self._prev_spoken_status = self.last_spoken_status
+        self.last_spoken_status = status
+        self.last_speech_time = current_time
             
     def speak_custom_message(self, message, priority="normal"):
         """Speak a custom message"""
         if not self.tts_engine:
             return
             
-        try:
-            self.speech_queue.put((message, priority), block=False)
-        except queue.Full:
-            pass
+        self._enqueue_speech(message, priority)
+        
+    def _enqueue_speech(self, message, priority):
+        """Queue a speech request and wake the worker, evicting old normal messages when full"""
+        with self._queue_lock:
+            queue = self.speech_queue
+            if len(queue) >= self.MAX_QUEUED_SPEECH:
+                victim = next((i for i, (_, queued_priority) in enumerate(queue) if queued_priority != "high"), None)
+                if victim is not None:
+                    print(f"[AI FEEDBACK] Speech queue full, dropped: {queue[victim][0]}")
+                    del queue[victim]
+                elif priority != "high":
+                    # Only critical messages are pending; they take precedence
+                    print(f"[AI FEEDBACK] Speech queue full, dropped: {message}")
+                    return
+            queue.append((message, priority))
+        self._has_speech.set()
             
     def speak_emergency_message(self):
         """Speak emergency wake-up message with high priority"""
-        emergency_messages = [
-            "Wake up! You've been inactive for too long!",
-            "Attention! Please focus on your studies!",
-            "Alert! Student attentiveness required!",
-            "Emergency! Please return to your work!"
-        ]
-        
         # Clear queue and speak immediately
         self._clear_speech_queue()
         
-        for message in emergency_messages:
+        for message in self.EMERGENCY_MESSAGES:
             if self.stop_speech:
                 break
-            try:
-                self.speech_queue.put((message, "high"), block=False)
-                time.sleep(1.5)  # Pause between messages
-            except queue.Full:
-                break
+            self._enqueue_speech(message, "high")
+            time.sleep(1.5)  # Pause between messages
                 
     def speak_head_pose_feedback(self, head_direction, attention_score):
         """Provide feedback based on head pose"""
@@ -249,12 +298,8 @@ class AIFeedback:
                 
     def _clear_speech_queue(self):
         """Clear all pending speech requests"""
-        while not self.speech_queue.empty():
-            try:
-                self.speech_queue.get_nowait()
-                self.speech_queue.task_done()
-            except queue.Empty:
-                break
+        with self._queue_lock:
+            self.speech_queue.clear()
                 
     def stop_all_speech(self):
         """Stop all speech immediately"""
@@ -263,7 +308,8 @@ class AIFeedback:
         
         if self.tts_engine:
             try:
-                self.tts_engine.stop()
+                # Only interrupt our own live speech on the shared engine
+                stop(self)
             except:
                 pass
                 
@@ -273,12 +319,13 @@ class AIFeedback:
         
     def get_queue_size(self):
         """Get current speech queue size"""
-        return self.speech_queue.qsize()
+        return len(self.speech_queue)
         
     def reset_speech_timing(self):
         """Reset speech timing to allow immediate feedback"""
         self.last_speech_time = 0
         self.last_spoken_status = None
+        self._prev_spoken_status = None
         
     def __del__(self):
         """Cleanup when object is destroyed"""
@@ -1,15 +1,29 @@
 import threading
 import time
 import os
+import numpy as np
 import pygame
 from PyQt5.QtWidgets import QWidget
 from PyQt5.QtCore import QTimer, pyqtSignal, QObject
 from PyQt5.QtGui import QPalette
-import pyttsx3
+from utils._tts import cached_sound, get_engine, prerender, release_sounds, speak, stop, stop_channel, wait
 
 class EmergencyWakeup(QObject):
     flash_signal = pyqtSignal(str)  # Signal to change screen color
     
+    # The siren waveform never changes, so it is synthesised once per process
+    _siren_samples = None
+    
+    WAKE_UP_MESSAGES = (
+        "Wake up! You've been inactive for too long!",
+        "Attention! Please focus on your studies!",
+        "Alert! Student attentiveness required!",
+        "Please return to your study position!"
+    )
+    SPEECH_RATE = 200
+    SPEECH_VOLUME = 1.0
+    SPEECH_VOICE = None  # Engine default voice, whatever AIFeedback picked
+    
     def __init__(self):
         super().__init__()
         # Initialize all attributes first to prevent AttributeError
@@ -19,6 +33,9 @@ class EmergencyWakeup(QObject):
         self.siren_thread = None
         self.tts_thread = None
         self.siren_sound = None
+        # (sound, channel) of the wake-up message being played, so stopping
+        # the emergency only stops our own playback
+        self._speech_playback = None
         self.tts_engine = None
         self.pygame_initialized = False
         
@@ -32,9 +49,9 @@ class EmergencyWakeup(QObject):
         
         # Initialize text-to-speech
         try:
-            self.tts_engine = pyttsx3.init()
-            self.tts_engine.setProperty('rate', 200)
-            self.tts_engine.setProperty('volume', 1.0)
+            # Shared with AIFeedback; rate and volume are applied per utterance
+            self.tts_engine = get_engine()
+            prerender(self.WAKE_UP_MESSAGES, self.SPEECH_RATE, self.SPEECH_VOLUME, self.SPEECH_VOICE)
         except Exception as e:
             print(f"Could not initialize TTS engine: {e}")
             self.tts_engine = None
@@ -42,34 +59,30 @@ class EmergencyWakeup(QObject):
         # Create siren sound programmatically
         self.create_siren_sound()
         
+    @classmethod
+    def _build_siren_samples(cls):
+        """Synthesise the stereo int16 siren waveform"""
+        duration = 0.5    # seconds
+        sample_rate = 44100
+        
+        frames = int(duration * sample_rate)
+        t = np.arange(frames, dtype=np.float64) / sample_rate
+        
+        # Create alternating high and low frequency for siren effect
+        freq = 800.0 + 400.0 * np.sin(2 * np.pi * 2.0 * t)  # 2 Hz modulation
+        arr = (32767.0 * np.sin(2 * np.pi * freq * t)).astype(np.int16)
+        
+        # Convert to stereo in a single contiguous allocation
+        return np.column_stack((arr, arr))
+        
     def create_siren_sound(self):
         """Create a siren sound using pygame"""
         try:
-            import numpy as np
-            
-            # Create a simple beep sound
-            frequency = 1000  # Hz
-            duration = 0.5    # seconds
-            sample_rate = 44100
-            
-            frames = int(duration * sample_rate)
-            arr = np.zeros(frames)
-            
-            for i in range(frames):
-                time_point = float(i) / sample_rate
-                # Create alternating high and low frequency for siren effect
-                freq = 800 + 400 * np.sin(2 * np.pi * 2 * time_point)  # 2 Hz modulation
-                arr[i] = 32767 * np.sin(2 * np.pi * freq * time_point)
+            if EmergencyWakeup._siren_samples is None:
+                EmergencyWakeup._siren_samples = self._build_siren_samples()
                 
-            arr = arr.astype(np.int16)
-            
-            # Convert to stereo
-            stereo_arr = np.zeros((frames, 2), dtype=np.int16)
-            stereo_arr[:, 0] = arr
-            stereo_arr[:, 1] = arr
-            
             # Create pygame sound
-            self.siren_sound = pygame.sndarray.make_sound(stereo_arr)
+            self.siren_sound = pygame.sndarray.make_sound(EmergencyWakeup._siren_samples)
             
         except Exception as e:
             print(f"Could not create siren sound: {e}")
@@ -143,22 +156,23 @@ class EmergencyWakeup(QObject):
         
     def speak_wake_up_message(self):
         """Speak wake-up message using text-to-speech continuously"""
-        def speak():
+        def speak_messages():
             try:
-                messages = [
-                    "Wake up! You've been inactive for too long!",
-                    "Attention! Please focus on your studies!",
-                    "Alert! Student attentiveness required!",
-                    "Please return to your study position!"
-                ]
+                messages = self.WAKE_UP_MESSAGES
                 
                 message_index = 0
                 while self.is_emergency_active:
                     if hasattr(self, 'tts_engine') and self.tts_engine is not None:
                         try:
                             message = messages[message_index % len(messages)]
-                            self.tts_engine.say(message)
-                            self.tts_engine.runAndWait()
+                            sound = cached_sound(message, self.SPEECH_RATE, self.SPEECH_VOLUME, self.SPEECH_VOICE)
+                            if sound is not None:
+                                self._speech_playback = (sound, sound.play())
+                                wait(*self._speech_playback, lambda: not self.is_emergency_active)
+                                self._speech_playback = None
+                            else:
+                                speak(message, rate=self.SPEECH_RATE, volume=self.SPEECH_VOLUME,
+                                      voice=self.SPEECH_VOICE, owner=self)
                             message_index += 1
                         except Exception as e:
                             print(f"Error in TTS playback: {e}")
@@ -175,7 +189,7 @@ class EmergencyWakeup(QObject):
         except Exception as e:
             print(f"Error checking TTS thread: {e}")
             
-        self.tts_thread = threading.Thread(target=speak, daemon=True)
+        self.tts_thread = threading.Thread(target=speak_messages, daemon=True)
         self.tts_thread.start()
         
     def stop_emergency(self):
@@ -201,17 +215,21 @@ class EmergencyWakeup(QObject):
         except Exception as e:
             print(f"Error emitting flash signal: {e}")
         
-        # Stop pygame sounds
+        # Stop our own sounds; other channels (AIFeedback alerts) keep playing
         try:
             if self.pygame_initialized:
-                pygame.mixer.stop()
+                if self.siren_sound is not None:
+                    self.siren_sound.stop()
+                playback = self._speech_playback
+                if playback is not None:
+                    stop_channel(*playback)
         except Exception as e:
-            print(f"Error stopping pygame mixer: {e}")
+            print(f"Error stopping emergency sounds: {e}")
             
-        # Stop TTS engine
+        # Stop our own live speech; the engine is shared with AIFeedback
         try:
             if hasattr(self, 'tts_engine') and self.tts_engine is not None:
-                self.tts_engine.stop()
+                stop(self)
         except Exception as e:
             print(f"Error stopping TTS engine: {e}")
                 
@@ -240,6 +258,7 @@ class EmergencyWakeup(QObject):
         # Cleanup pygame
         try:
             if hasattr(self, 'pygame_initialized') and self.pygame_initialized:
+                release_sounds()
                 pygame.mixer.quit()
         except Exception as e:
             print(f"Error quitting pygame mixer: {e}")
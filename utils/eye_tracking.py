@@ -1,171 +1,261 @@
+import math
 import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
 import cv2
-from scipy.spatial import distance
+from utils._jit import njit
+
+# MediaPipe face mesh landmark indices for eyes, in contour order
+LEFT_EYE_IDX = np.array([33, 7, 163, 144, 145, 153, 154, 155, 133, 173, 157, 158, 159, 160, 161, 246], dtype=np.int32)
+RIGHT_EYE_IDX = np.array([362, 382, 381, 380, 374, 373, 390, 249, 263, 466, 388, 387, 386, 385, 384, 398], dtype=np.int32)
+
+# Eye landmarks for EAR calculation: outer, top, bottom, inner, top, bottom
+LEFT_EYE_EAR_IDX = np.array([33, 160, 158, 133, 153, 144], dtype=np.int32)
+RIGHT_EYE_EAR_IDX = np.array([362, 385, 387, 263, 373, 380], dtype=np.int32)
+EYE_EAR_IDX = np.stack((LEFT_EYE_EAR_IDX, RIGHT_EYE_EAR_IDX))  # (2, 6): both eyes share the topology
+
+# Drowsiness level for EAR below each threshold - CALIBRATED
+# (searchsorted index = number of thresholds the EAR has reached)
+DROWSY_EAR_THRESHOLDS = np.array([0.12, 0.16, 0.20, 0.24, 0.28])
+DROWSY_LEVELS = np.array([100, 80, 60, 40, 20, 0])
+
+# Eye status per EAR band; 0.35 splits "Normal" from "Wide Awake"
+EYE_STATUS_THRESHOLDS = np.array([0.12, 0.16, 0.20, 0.24, 0.28, 0.35])
+EYE_STATUSES = ("Eyes Closed", "Eyes Closed", "Very Drowsy", "Moderately Drowsy",
+                "Slightly Drowsy", "Normal", "Wide Awake")
+
+# Head pose EAR compensation, indexed by (pitch > 10) - (pitch < -10) + 1 and
+# abs(yaw) > 20. Looking up slightly increases apparent EAR, looking down
+# decreases it, and side turning needs a slight compensation
+PITCH_EAR_GAIN = (0.95, 1.0, 1.1)
+YAW_EAR_GAIN = (1.0, 1.05)
+
+@njit(cache=True, fastmath=True)
+def _point_distance(landmarks, a, b):
+    """Euclidean distance between landmarks a and b of an (N, 2) array"""
+    dx = float(landmarks[a, 0]) - float(landmarks[b, 0])
+    dy = float(landmarks[a, 1]) - float(landmarks[b, 1])
+    return math.sqrt(dx * dx + dy * dy)
+
+@njit(cache=True, fastmath=True)
+def _eye_aspect_ratio(landmarks, eye_idx):
+    """EAR = (|p2-p6| + |p3-p5|) / (2 * |p1-p4|) for the 6 eye points at eye_idx, -1.0 if the eye is too narrow"""
+    vertical_dist1 = _point_distance(landmarks, eye_idx[1], eye_idx[5])  # Top to bottom
+    vertical_dist2 = _point_distance(landmarks, eye_idx[2], eye_idx[4])  # Top to bottom
+    horizontal_dist = _point_distance(landmarks, eye_idx[0], eye_idx[3])  # Left to right
+    
+    if horizontal_dist <= 0.5:
+        return -1.0
+    
+    # Clamp EAR to reasonable range
+    ear = (vertical_dist1 + vertical_dist2) / (2.0 * horizontal_dist)
+    return max(0.0, min(1.0, ear))
+
+@njit(cache=True, fastmath=True)
+def _ear_kernel(landmarks, eyes_idx, fallback):
+    """Average EAR of the eyes in eyes_idx (one row of 6 indices per eye), read straight from the (N, 2) landmarks"""
+    total = 0.0
+    for eye in range(eyes_idx.shape[0]):
+        ear = _eye_aspect_ratio(landmarks, eyes_idx[eye])
+        # Keep previous value if calculation seems off
+        total += fallback if ear < 0.0 else ear
+    return total / eyes_idx.shape[0]
+
+class _EyeState:
+    """Per-frame EyeTracker state kept in slots instead of instance attributes"""
+    __slots__ = ("ear_ring", "ring_idx", "ring_count", "ring_sum",
+                 "last_ear", "drowsy_frame_count", "stable_drowsy_count")
+    
+    def __init__(self, window=8):
+        # EAR smoothing window as a ring buffer with a running sum
+        self.ear_ring = np.zeros(window)
+        self.reset()
+        
+    def reset(self):
+        self.ear_ring.fill(0.0)
+        self.ring_idx = 0
+        self.ring_count = 0
+        self.ring_sum = 0.0
+        self.last_ear = 0.3  # Better default value
+        self.drowsy_frame_count = 0
+        self.stable_drowsy_count = 0
 
 class EyeTracker:
     def __init__(self):
         # MediaPipe face mesh landmark indices for eyes
-        self.left_eye_landmarks = [33, 7, 163, 144, 145, 153, 154, 155, 133, 173, 157, 158, 159, 160, 161, 246]
-        self.right_eye_landmarks = [362, 382, 381, 380, 374, 373, 390, 249, 263, 466, 388, 387, 386, 385, 384, 398]
+        self.left_eye_landmarks = LEFT_EYE_IDX
+        self.right_eye_landmarks = RIGHT_EYE_IDX
         
         # IMPROVED: More accurate eye landmarks for EAR calculation
-        self.left_eye_points = [33, 160, 158, 133, 153, 144]  # Outer, top, bottom, inner, top, bottom
-        self.right_eye_points = [362, 385, 387, 263, 373, 380]  # Outer, top, bottom, inner, top, bottom
+        self.left_eye_points = LEFT_EYE_EAR_IDX
+        self.right_eye_points = RIGHT_EYE_EAR_IDX
+        self._eye_idx = EYE_EAR_IDX
+        self._eye_key_idx = EYE_EAR_IDX.ravel()  # Key points drawn on both eyes
         
         # EAR thresholds - ADJUSTED for better accuracy
         self.ear_threshold = 0.22  # Slightly reduced for better sensitivity
         self.consecutive_frames = 4  # Increased for stability
         
         # State tracking
-        self.ear_history = []
-        self.drowsy_frame_count = 0
-        self.last_ear = 0.3  # Better default value
+        self._state = _EyeState(window=8)  # Keep last 8 values for smoothing
         
         # NEW: Stability and smoothing
-        self.stable_drowsy_count = 0
         self.stable_threshold = 3
         
+        # Compile the EAR kernel now rather than on the first camera frame
+        _ear_kernel(np.zeros((478, 2), dtype=np.int32), self._eye_idx, self._state.last_ear)
+        
+    @property
+    def last_ear(self):
+        """Most recent smoothed EAR"""
+        return self._state.last_ear
+        
+    @property
+    def drowsy_frame_count(self):
+        return self._state.drowsy_frame_count
+        
+    @property
+    def stable_drowsy_count(self):
+        return self._state.stable_drowsy_count
+        
+    @staticmethod
+    def landmarks_from_mediapipe(face_landmarks, w, h):
+        """
+        Convert one MediaPipe face to pixel coordinates in a single pass.
+        
+        Build this once per frame and pass the same array to every feature
+        module (EAR, MAR, drawing) instead of indexing the protobuf again.
+        
+        Args:
+            face_landmarks: MediaPipe face landmarks (with a ``.landmark`` list)
+            w (int): Frame width in pixels
+            h (int): Frame height in pixels
+            
+        Returns:
+            numpy.ndarray: (N, 2) int32 array of pixel coordinates
+        """
+        face_points = face_landmarks.landmark
+        normalized = np.fromiter(
+            (c for landmark in face_points for c in (landmark.x, landmark.y)),
+            dtype=np.float32, count=2 * len(face_points)).reshape(-1, 2)
+        normalized *= np.array([w, h], dtype=np.float32)
+        return normalized.astype(np.int32)
+        
     def calculate_ear(self, landmarks, head_pose_data=None):
         """Calculate Eye Aspect Ratio (EAR) with head pose compensation"""
         try:
-            # Get left and right eye EAR
-            left_ear = self._calculate_single_eye_ear(landmarks, self.left_eye_points)
-            right_ear = self._calculate_single_eye_ear(landmarks, self.right_eye_points)
-            
-            # Average of both eyes
-            ear = (left_ear + right_ear) / 2.0
+            landmarks = np.asarray(landmarks)
+            st = self._state
+            if self._eye_idx.max() >= len(landmarks):
+                # Return default if landmarks are missing
+                ear = 0.25
+            else:
+                # Both eyes in one compiled call, gathering points in place
+                ear = _ear_kernel(landmarks, self._eye_idx, st.last_ear)
             
             # NEW: Compensate for head pose effects
             if head_pose_data:
-                ear = self._compensate_for_head_pose(ear, head_pose_data)
+                pitch = head_pose_data.get('pitch', 0)
+                yaw = head_pose_data.get('yaw', 0)
+                ear *= PITCH_EAR_GAIN[(pitch > 10) - (pitch < -10) + 1] * YAW_EAR_GAIN[abs(yaw) > 20]
             
             # SMOOTHING: Apply moving average to reduce noise
-            self.ear_history.append(ear)
-            if len(self.ear_history) > 8:  # Keep last 8 values for smoothing
-                self.ear_history.pop(0)
+            ring = st.ear_ring
+            st.ring_sum += ear - ring.item(st.ring_idx)
+            ring[st.ring_idx] = ear
+            st.ring_idx = (st.ring_idx + 1) % len(ring)
+            if st.ring_count < len(ring):
+                st.ring_count += 1
+            elif st.ring_idx == 0:
+                # Resum once per lap so rounding error cannot accumulate
+                st.ring_sum = float(ring.sum())
                 
             # Use smoothed EAR
-            smoothed_ear = sum(self.ear_history) / len(self.ear_history)
-            self.last_ear = smoothed_ear
+            smoothed_ear = st.ring_sum / st.ring_count
+            st.last_ear = smoothed_ear
             return smoothed_ear
             
         except Exception as e:
             print(f"Error calculating EAR: {e}")
-            return self.last_ear
+            return self._state.last_ear
             
-    def _calculate_single_eye_ear(self, landmarks, eye_points):
-        """Calculate EAR for a single eye - IMPROVED accuracy"""
-        try:
-            # Get eye landmark coordinates with validation
-            eye_coords = []
-            for point_idx in eye_points:
-                if point_idx < len(landmarks):
-                    eye_coords.append(landmarks[point_idx])
-                else:
-                    # Return default if landmarks are missing
-                    return 0.25
-                    
-            if len(eye_coords) < 6:
-                return 0.25
-                
-            # Convert to numpy array for easier calculation
-            eye_coords = np.array(eye_coords)
-            
-            # IMPROVED EAR calculation with multiple measurements
-            # EAR = (|p2-p6| + |p3-p5|) / (2 * |p1-p4|)
-            
-            # Multiple vertical distances for better accuracy
-            vertical_dist1 = np.linalg.norm(eye_coords[1] - eye_coords[5])  # Top to bottom
-            vertical_dist2 = np.linalg.norm(eye_coords[2] - eye_coords[4])  # Top to bottom
-            
-            # Horizontal distance
-            horizontal_dist = np.linalg.norm(eye_coords[0] - eye_coords[3])  # Left to right
-            
-            # Calculate EAR with better error handling
-            if horizontal_dist > 0.5:  # Ensure reasonable horizontal distance
-                ear = (vertical_dist1 + vertical_dist2) / (2.0 * horizontal_dist)
-                
-                # Clamp EAR to reasonable range
-                ear = max(0.0, min(1.0, ear))
-            else:
-                ear = self.last_ear  # Keep previous value if calculation seems off
-                
-            return ear
-            
-        except Exception as e:
-            print(f"Error in single eye EAR calculation: {e}")
-            return 0.25
-            
-    def _compensate_for_head_pose(self, ear, head_pose_data):
-        """Compensate EAR for head pose effects - NEW FEATURE"""
-        try:
-            pitch = head_pose_data.get('pitch', 0)
-            yaw = head_pose_data.get('yaw', 0)
-            
-            # Adjust EAR based on head pose
-            # Looking up slightly increases apparent EAR
-            if pitch > 10:
-                ear *= 1.1  # Slight increase
-            elif pitch < -10:
-                ear *= 0.95  # Slight decrease
-                
-            # Side turning can affect EAR measurement
-            if abs(yaw) > 20:
-                ear *= 1.05  # Slight compensation for side view
-                
-            return ear
+    def calculate_ear_batch(self, landmarks, fallback=0.3):
+        """
+        Calculate EAR for a whole recording at once, for offline analysis.
+        
+        Does not touch the live tracking state. Smoothing uses the same
+        trailing window as calculate_ear, so the smoothed values match
+        feeding the frames one by one (without head pose compensation),
+        except that an eye too narrow to measure counts as fallback instead
+        of the last smoothed EAR.
+        
+        Args:
+            landmarks (numpy.ndarray): (F, N, 2) landmark pixel coordinates per frame
+            fallback (float): EAR used for an eye too narrow to measure
             
-        except Exception as e:
-            print(f"Error in head pose compensation: {e}")
-            return ear
+        Returns:
+            tuple: (raw EAR, smoothed EAR), both float64 arrays of shape (F,)
+        """
+        landmarks = np.asarray(landmarks, dtype=np.float64)
+        window = len(self._state.ear_ring)
+        if len(landmarks) == 0:
+            return np.empty(0), np.empty(0)
             
+        # (F, 2 eyes, 6 points, 2) in one gather
+        pts = landmarks[:, self._eye_idx]
+        vertical = (np.hypot(*(pts[:, :, 1] - pts[:, :, 5]).transpose(2, 0, 1)) +
+                    np.hypot(*(pts[:, :, 2] - pts[:, :, 4]).transpose(2, 0, 1)))
+        horizontal = np.hypot(*(pts[:, :, 0] - pts[:, :, 3]).transpose(2, 0, 1))
+        
+        with np.errstate(divide='ignore', invalid='ignore'):
+            eye_ears = np.clip(vertical / (2.0 * horizontal), 0.0, 1.0)
+        eye_ears = np.where(horizontal > 0.5, eye_ears, fallback)
+        ears = eye_ears.mean(axis=1)
+        
+        # NaN-pad the leading edge so the first frames average only what
+        # has been seen so far, like the live ring buffer
+        padded = np.concatenate((np.full(window - 1, np.nan), ears))
+        smoothed = np.nanmean(sliding_window_view(padded, window), axis=-1)
+        return ears, smoothed
+        
     def is_drowsy(self, ear=None, head_turned_away=False):
         """Determine drowsiness with head turn consideration - FIXED"""
+        st = self._state
         if ear is None:
-            ear = self.last_ear
+            ear = st.last_ear
             
         # NEW: Don't detect drowsiness if head is significantly turned away
         # This prevents false drowsiness detection when head movement affects eye landmarks
         if head_turned_away:
             # Reset drowsiness detection when head is turned away
-            self.drowsy_frame_count = 0
-            self.stable_drowsy_count = 0
+            st.drowsy_frame_count = 0
+            st.stable_drowsy_count = 0
             return False
             
         if ear < self.ear_threshold:
-            self.drowsy_frame_count += 1
-            self.stable_drowsy_count += 1
+            st.drowsy_frame_count += 1
+            st.stable_drowsy_count += 1
         else:
-            self.drowsy_frame_count = 0
-            self.stable_drowsy_count = 0
+            st.drowsy_frame_count = 0
+            st.stable_drowsy_count = 0
             
         # Require both consecutive frames AND stability
-        return (self.drowsy_frame_count >= self.consecutive_frames and 
-                self.stable_drowsy_count >= self.stable_threshold)
+        return (st.drowsy_frame_count >= self.consecutive_frames and 
+                st.stable_drowsy_count >= self.stable_threshold)
         
     def get_drowsiness_level(self, ear=None):
         """Get drowsiness level as a percentage - CALIBRATED"""
         if ear is None:
-            ear = self.last_ear
+            ear = self._state.last_ear
             
-        if ear >= 0.28:
-            return 0  # Fully awake
-        elif ear >= 0.24:
-            return 20  # Slightly drowsy
-        elif ear >= 0.20:
-            return 40  # Moderately drowsy
-        elif ear >= 0.16:
-            return 60  # Very drowsy
-        elif ear >= 0.12:
-            return 80  # Extremely drowsy
-        else:
-            return 100  # Eyes closed
+        # 0 fully awake ... 100 eyes closed
+        return int(DROWSY_LEVELS[np.searchsorted(DROWSY_EAR_THRESHOLDS, ear, side='right')])
             
     def get_average_ear(self):
         """Get average EAR from recent history"""
-        if not self.ear_history:
+        st = self._state
+        if not st.ring_count:
             return 0.0
-        return sum(self.ear_history) / len(self.ear_history)
+        return st.ring_sum / st.ring_count
         
     def draw_eye_contours(self, frame, landmarks):
         """Draw eye contours with enhanced visualization"""
@@ -186,58 +276,34 @@ class EyeTracker:
                 color = (0, 255, 0)  # Green for normal
                 thickness = 1
                 
-            # Draw left eye
-            left_eye_coords = []
-            for idx in self.left_eye_landmarks:
-                if idx < len(landmarks):
-                    left_eye_coords.append(landmarks[idx])
-                    
-            if len(left_eye_coords) > 3:
-                left_eye_coords = np.array(left_eye_coords, dtype=np.int32)
-                cv2.polylines(frame, [left_eye_coords], True, color, thickness)
-                
-            # Draw right eye
-            right_eye_coords = []
-            for idx in self.right_eye_landmarks:
-                if idx < len(landmarks):
-                    right_eye_coords.append(landmarks[idx])
+            landmarks = np.asarray(landmarks)
+            num_landmarks = len(landmarks)
+            
+            # Draw both eye contours in one call
+            eye_contours = []
+            for eye_idx in (self.left_eye_landmarks, self.right_eye_landmarks):
+                eye_coords = landmarks[eye_idx[eye_idx < num_landmarks]].astype(np.int32, copy=False)
+                if len(eye_coords) > 3:
+                    eye_contours.append(eye_coords)
                     
-            if len(right_eye_coords) > 3:
-                right_eye_coords = np.array(right_eye_coords, dtype=np.int32)
-                cv2.polylines(frame, [right_eye_coords], True, color, thickness)
+            if eye_contours:
+                cv2.polylines(frame, eye_contours, True, color, thickness)
                 
             # Draw key points
-            for point_idx in self.left_eye_points + self.right_eye_points:
-                if point_idx < len(landmarks):
-                    cv2.circle(frame, tuple(landmarks[point_idx]), 2, color, -1)
+            key_points = landmarks[self._eye_key_idx[self._eye_key_idx < num_landmarks]]
+            for x, y in key_points.astype(np.int32, copy=False).tolist():
+                cv2.circle(frame, (x, y), 2, color, -1)
                 
         except Exception as e:
             print(f"Error drawing eye contours: {e}")
             
     def reset_state(self):
         """Reset the eye tracker state"""
-        self.ear_history.clear()
-        self.drowsy_frame_count = 0
-        self.stable_drowsy_count = 0
-        self.last_ear = 0.3
+        self._state.reset()
         
     def get_eye_status(self):
         """Get current eye status with more detail"""
-        ear = self.last_ear
-        drowsiness = self.get_drowsiness_level()
-        
-        if drowsiness >= 80:
-            return "Eyes Closed"
-        elif drowsiness >= 60:
-            return "Very Drowsy"
-        elif drowsiness >= 40:
-            return "Moderately Drowsy"
-        elif drowsiness >= 20:
-            return "Slightly Drowsy"
-        elif ear >= 0.35:
-            return "Wide Awake"
-        else:
-            return "Normal"
+        return EYE_STATUSES[np.searchsorted(EYE_STATUS_THRESHOLDS, self._state.last_ear, side='right')]
             
     def is_reliable_measurement(self, head_pose_data=None):
         """Check if current EAR measurement is reliable given head pose"""
@@ -255,19 +321,20 @@ class EyeTracker:
         
     def get_eye_statistics(self):
         """Get statistics about eye tracking"""
-        if not self.ear_history:
+        st = self._state
+        if not st.ring_count:
             return {
                 'average_ear': 0.0,
-                'current_ear': self.last_ear,
+                'current_ear': st.last_ear,
                 'drowsiness_level': 0,
                 'measurements_count': 0
             }
             
         return {
             'average_ear': self.get_average_ear(),
-            'current_ear': self.last_ear,
+            'current_ear': st.last_ear,
             'drowsiness_level': self.get_drowsiness_level(),
-            'measurements_count': len(self.ear_history),
-            'min_ear': min(self.ear_history),
-            'max_ear': max(self.ear_history)
+            'measurements_count': st.ring_count,
+            'min_ear': float(st.ear_ring[:st.ring_count].min()),
+            'max_ear': float(st.ear_ring[:st.ring_count].max())
         }
\ No newline at end of file
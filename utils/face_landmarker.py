@@ -0,0 +1,103 @@
+import os
+import time
+import mediapipe as mp
+
+# FaceLandmarker model bundle, downloadable from
+# https://storage.googleapis.com/mediapipe-models/face_landmarker/face_landmarker/float16/1/face_landmarker.task
+DEFAULT_MODEL_PATH = os.path.join("models", "face_landmarker.task")
+
+
+class _FaceLandmarks:
+    """One face in the legacy NormalizedLandmarkList shape (``.landmark``)"""
+    __slots__ = ("landmark",)
+
+    def __init__(self, landmark):
+        self.landmark = landmark
+
+
+class _FaceMeshResults:
+    """Legacy FaceMesh results shape (``.multi_face_landmarks``)"""
+    __slots__ = ("multi_face_landmarks",)
+
+    def __init__(self, multi_face_landmarks):
+        self.multi_face_landmarks = multi_face_landmarks
+
+
+class TaskFaceMesh:
+    def __init__(self, model_path, max_num_faces=5, use_gpu=True,
+                 min_detection_confidence=0.5, min_tracking_confidence=0.5):
+        """
+        FaceLandmarker (Task API) with the same process() interface as FaceMesh.
+
+        Args:
+            model_path (str): Path to the face_landmarker.task model bundle
+            max_num_faces (int): Maximum number of faces to return
+            use_gpu (bool): Run inference on the GPU delegate
+        """
+        from mediapipe.tasks.python import BaseOptions, vision
+
+        delegate = BaseOptions.Delegate.GPU if use_gpu else BaseOptions.Delegate.CPU
+        options = vision.FaceLandmarkerOptions(
+            base_options=BaseOptions(model_asset_path=model_path, delegate=delegate),
+            # VIDEO mode is synchronous; the inference thread already keeps
+            # it off the GUI thread
+            running_mode=vision.RunningMode.VIDEO,
+            num_faces=max_num_faces,
+            min_face_detection_confidence=min_detection_confidence,
+            min_tracking_confidence=min_tracking_confidence
+        )
+        self.landmarker = vision.FaceLandmarker.create_from_options(options)
+        self._start_time = time.monotonic()
+        self._last_timestamp_ms = -1
+
+    def process(self, rgb_image):
+        """
+        Run the landmarker on an RGB frame.
+
+        Returns:
+            Object with ``multi_face_landmarks`` (None when no face is found)
+        """
+        image = mp.Image(image_format=mp.ImageFormat.SRGB, data=rgb_image)
+
+        # VIDEO mode requires strictly increasing timestamps
+        timestamp_ms = int((time.monotonic() - self._start_time) * 1000)
+        timestamp_ms = max(timestamp_ms, self._last_timestamp_ms + 1)
+        self._last_timestamp_ms = timestamp_ms
+
+        result = self.landmarker.detect_for_video(image, timestamp_ms)
+        faces = [_FaceLandmarks(face) for face in result.face_landmarks]
+        return _FaceMeshResults(faces or None)
+
+    def close(self):
+        self.landmarker.close()
+
+
+def create_face_mesh(model_path=DEFAULT_MODEL_PATH, max_num_faces=5, refine_landmarks=True,
+                     min_detection_confidence=0.5, min_tracking_confidence=0.5):
+    """
+    Create the fastest available face mesh backend.
+
+    Tries FaceLandmarker on the GPU delegate, then on the CPU, and falls back
+    to the legacy FaceMesh solution when the model bundle is missing or the
+    Task API cannot be created on this platform.
+
+    Returns:
+        Object with a FaceMesh-compatible process(rgb_image) method
+    """
+    if os.path.isfile(model_path):
+        for use_gpu in (True, False):
+            try:
+                face_mesh = TaskFaceMesh(model_path, max_num_faces, use_gpu,
+                                         min_detection_confidence, min_tracking_confidence)
+                print(f"FaceLandmarker initialized on {'GPU' if use_gpu else 'CPU'}")
+                return face_mesh
+            except Exception as e:
+                print(f"Could not initialize FaceLandmarker ({'GPU' if use_gpu else 'CPU'}): {e}")
+
+    return mp.solutions.face_mesh.FaceMesh(
+        static_image_mode=False,
+        max_num_faces=max_num_faces,
+        refine_landmarks=refine_landmarks,
+        min_detection_confidence=min_detection_confidence,
+        min_tracking_confidence=min_tracking_confidence
+    )
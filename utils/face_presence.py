@@ -1,24 +1,33 @@
 import cv2
 import mediapipe as mp
 import time
+from utils._mp_singletons import downscale_for_detection, get_face_detector
 
 class FacePresenceDetector:
-    def __init__(self, short_absence_threshold=3.0, long_absence_threshold=10.0):
+    def __init__(self, short_absence_threshold=3.0, long_absence_threshold=10.0, detection_interval=2):
         """
         Initialize the Face Presence Detector.
         
         Args:
             short_absence_threshold (float): Time in seconds for "Inactive (Face Missing)" status
             long_absence_threshold (float): Time in seconds for "Not Awake" status
+            detection_interval (int): While a face is present, run detection on every
+                Nth frame and reuse the last result in between
         """
         self.short_absence_threshold = short_absence_threshold
         self.long_absence_threshold = long_absence_threshold
         self.face_lost_time = None
         self.last_face_detected_time = time.time()
+        self.detection_interval = detection_interval
+        self._frame_i = 0
+        self._last_results = None
+        # Outcome of the last detection, read back by the peek_* methods
+        self._last_detections = None
+        self._last_confidence = 0.0
         
-        # Initialize MediaPipe Face Detection
+        # Initialize MediaPipe Face Detection (shared with MultipleFaceDetector)
         self.mp_face_detection = mp.solutions.face_detection
-        self.face_detection = self.mp_face_detection.FaceDetection(
+        self.face_detection = get_face_detector(
             model_selection=0,  # Short-range model for webcam
             min_detection_confidence=0.5
         )
@@ -36,11 +45,34 @@ class FacePresenceDetector:
         if image is None:
             return self._handle_no_face()
             
-        # Convert BGR to RGB for MediaPipe
-        rgb_image = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
+        # Shrink before converting BGR to RGB for MediaPipe
+        return self.check_face_presence_rgb(cv2.cvtColor(downscale_for_detection(image), cv2.COLOR_BGR2RGB))
         
-        # Process the image
-        results = self.face_detection.process(rgb_image)
+    def check_face_presence_rgb(self, rgb_image, frame_id=None):
+        """
+        Check face presence on a frame that is already RGB.
+        
+        Args:
+            rgb_image (numpy.ndarray): RGB image, shared with other detectors
+            frame_id (int): Frame identifier, lets detectors share one inference per frame
+            
+        Returns:
+            str: "Active", "Inactive (Face Missing)", or "Not Awake"
+        """
+        if rgb_image is None:
+            return self._handle_no_face()
+            
+        # Presence changes on a seconds timescale, so skip frames while the
+        # face is present; once it is lost every frame is checked again
+        self._frame_i += 1
+        if (self._last_results is not None and self.face_lost_time is None and
+                self._frame_i % self.detection_interval):
+            results = self._last_results
+        else:
+            # Process the image
+            results = self.face_detection.process(rgb_image, frame_id)
+            self._last_results = results
+            self._store_detections(results)
         
         current_time = time.time()
         
@@ -53,6 +85,14 @@ class FacePresenceDetector:
             # No face detected
             return self._handle_no_face()
     
+    def _store_detections(self, results):
+        """Remember detections and the best confidence for the peek_* methods"""
+        self._last_detections = results.detections or None
+        if self._last_detections:
+            self._last_confidence = max(detection.score[0] for detection in self._last_detections)
+        else:
+            self._last_confidence = 0.0
+    
     def _handle_no_face(self):
         """
         Handle the case when no face is detected.
@@ -101,6 +141,28 @@ class FacePresenceDetector:
         """Reset the detector state."""
         self.face_lost_time = None
         self.last_face_detected_time = time.time()
+        self._frame_i = 0
+        self._last_results = None
+        self._last_detections = None
+        self._last_confidence = 0.0
+    
+    def peek_face_present(self):
+        """
+        Face presence from the last detection, without running inference.
+        
+        Returns:
+            bool: True if the last processed frame contained a face
+        """
+        return self._last_detections is not None
+    
+    def peek_face_confidence(self):
+        """
+        Highest face confidence from the last detection, without running inference.
+        
+        Returns:
+            float: Confidence score (0.0 to 1.0), 0.0 if no face was detected
+        """
+        return self._last_confidence
     
     def is_face_present(self, image):
         """
@@ -115,10 +177,26 @@ class FacePresenceDetector:
         if image is None:
             return False
             
-        rgb_image = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
-        results = self.face_detection.process(rgb_image)
+        return self.is_face_present_rgb(cv2.cvtColor(downscale_for_detection(image), cv2.COLOR_BGR2RGB))
+    
+    def is_face_present_rgb(self, rgb_image, frame_id=None):
+        """
+        Simple boolean check for face presence on an RGB frame.
         
-        return results.detections is not None and len(results.detections) > 0
+        Args:
+            rgb_image (numpy.ndarray): RGB image, shared with other detectors
+            frame_id (int): Frame identifier, reuses this frame's detection if already run
+            
+        Returns:
+            bool: True if face is detected, False otherwise
+        """
+        if rgb_image is None:
+            return False
+            
+        results = self.face_detection.process(rgb_image, frame_id)
+        self._store_detections(results)
+        
+        return self.peek_face_present()
     
     def get_face_confidence(self, image):
         """
@@ -133,15 +211,27 @@ class FacePresenceDetector:
         if image is None:
             return 0.0
             
-        rgb_image = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
-        results = self.face_detection.process(rgb_image)
+        return self.get_face_confidence_rgb(cv2.cvtColor(downscale_for_detection(image), cv2.COLOR_BGR2RGB))
+    
+    def get_face_confidence_rgb(self, rgb_image, frame_id=None):
+        """
+        Get the confidence score of face detection on an RGB frame.
         
-        if results.detections and len(results.detections) > 0:
-            # Return the highest confidence score if multiple faces
-            max_confidence = max(detection.score[0] for detection in results.detections)
-            return max_confidence
+        Args:
+            rgb_image (numpy.ndarray): RGB image, shared with other detectors
+            frame_id (int): Frame identifier, reuses this frame's detection if already run
+            
+        Returns:
+            float: Confidence score (0.0 to 1.0), 0.0 if no face detected
+        """
+        if rgb_image is None:
+            return 0.0
+            
+        results = self.face_detection.process(rgb_image, frame_id)
+        self._store_detections(results)
         
-        return 0.0
+        # Highest confidence score if multiple faces
+        return self.peek_face_confidence()
     
     def get_status_info(self):
         """
@@ -160,6 +250,17 @@ class FacePresenceDetector:
         }
         return info
 
+_DETECTOR = None
+
+def _get_detector():
+    """Lazily create the detector shared by the standalone functions"""
+    global _DETECTOR
+    if _DETECTOR is None:
+        # Standalone calls get unrelated images, not a frame sequence, so
+        # every call must run detection instead of reusing the last result
+        _DETECTOR = FacePresenceDetector(detection_interval=1)
+    return _DETECTOR
+
 def check_face_presence(image):
     """
     Standalone function for face presence detection.
@@ -170,10 +271,9 @@ def check_face_presence(image):
     Returns:
         str: "Active", "Inactive (Face Missing)", or "Not Awake"
     """
-    # Note: This creates a new detector each time, so it won't maintain state
-    # For persistent state tracking, use the class instance in your main application
-    detector = FacePresenceDetector()
-    return detector.check_face_presence(image)
+    # Note: All standalone calls share one detector, so absence timers carry
+    # over between calls. Use your own class instance for independent tracking
+    return _get_detector().check_face_presence(image)
 
 def is_face_present(image):
     """
@@ -185,5 +285,4 @@ def is_face_present(image):
     Returns:
         bool: True if face is detected, False otherwise
     """
-    detector = FacePresenceDetector()
-    return detector.is_face_present(image)
\ No newline at end of file
+    return _get_detector().is_face_present(image)
\ No newline at end of file
@@ -0,0 +1,214 @@
+import itertools
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+import cv2
+import numpy as np
+from PyQt5.QtCore import QThread, pyqtSignal
+
+# Process-wide frame numbers, so per-frame caches stay valid across pipeline restarts
+_frame_ids = itertools.count(1)
+
+
+def open_capture(index=0, width=640, height=480):
+    """Open a camera with a one-frame driver buffer and MJPG at a fixed size"""
+    cap = cv2.VideoCapture(index)
+    if cap.isOpened():
+        # Always hand back the freshest frame instead of a 4-frame backlog
+        cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)
+        # MJPG avoids the driver negotiating raw YUYV at native resolution
+        cap.set(cv2.CAP_PROP_FOURCC, cv2.VideoWriter_fourcc(*'MJPG'))
+        cap.set(cv2.CAP_PROP_FRAME_WIDTH, width)
+        cap.set(cv2.CAP_PROP_FRAME_HEIGHT, height)
+    return cap
+
+
+def _reuse_buffer(buf, shape):
+    """Return buf if it already has the requested shape, otherwise a new uint8 array"""
+    if buf is None or buf.shape != shape:
+        return np.empty(shape, dtype=np.uint8)
+    return buf
+
+
+class FrameGrabber(threading.Thread):
+    """Continuously read camera frames, keeping only the newest unread one"""
+
+    def __init__(self, cap):
+        super().__init__(daemon=True)
+        self.cap = cap
+        self.alive = False
+        self.latest = None
+        self._new_frame = threading.Condition()
+
+    def run(self):
+        self.alive = True
+        while self.alive:
+            ret, frame = self.cap.read()
+            if not ret:
+                time.sleep(0.01)
+                continue
+
+            # Overwrite any unread frame so the consumer never sees a stale one
+            with self._new_frame:
+                self.latest = frame
+                self._new_frame.notify()
+
+    def get_latest(self, timeout=None):
+        """
+        Take ownership of the newest unread frame.
+        
+        Args:
+            timeout (float): Seconds to wait for a new frame
+            
+        Returns:
+            numpy.ndarray or None: The frame, or None if none arrived in time
+        """
+        with self._new_frame:
+            if self.latest is None:
+                self._new_frame.wait(timeout)
+            # cap.read() allocates a fresh array per frame, so handing over
+            # the reference is safe without copying
+            frame, self.latest = self.latest, None
+        return frame
+
+    def stop(self):
+        """Stop reading frames and wait for the thread to exit"""
+        self.alive = False
+        if self.is_alive():
+            self.join(timeout=1.0)
+
+
+class InferenceThread(QThread):
+    """Run flip, colour conversion and MediaPipe face mesh off the GUI thread"""
+
+    # (mirrored BGR frame, face mesh results or None, face detections or None,
+    # face presence status or None). The frame stays valid until
+    # frame_consumed is set
+    frame_ready = pyqtSignal(object, object, object, object)
+
+    def __init__(self, grabber, face_mesh, face_detector=None, presence_detector=None,
+                 inference_scale=0.5, mesh_interval=2):
+        super().__init__()
+        self.grabber = grabber
+        self.face_mesh = face_mesh
+        # Face mesh only tracks one face; the cheaper BlazeFace detector
+        # counts faces instead (and skips frames on its own)
+        self.face_detector = face_detector
+        # Presence is checked here too, so BlazeFace never runs on the GUI
+        # thread when the face is lost
+        self.presence_detector = presence_detector
+        # Face mesh landmarks are normalised, so inference can run on a
+        # smaller copy while the full-size frame is kept for display
+        self.inference_scale = inference_scale
+        # Run face mesh on every Nth frame and reuse its landmarks in
+        # between - EAR/MAR change slowly compared to the camera rate
+        self.mesh_interval = mesh_interval
+        self._frame_idx = 0
+        self._last_results = None
+        # MediaPipe releases the GIL while its graph runs, so face mesh on
+        # this executor overlaps with face counting on the worker thread
+        self._mesh_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="face-mesh")
+        
+        # Persistent per-frame buffers. Reusing the flip buffer is safe
+        # because the next frame is only read after the GUI consumed this one
+        self._flip_buf = None
+        self._rgb_buf = None
+        self._small_buf = None
+        self.detection_active = False
+        self.running = False
+
+        # Set by the GUI once it has displayed the last frame, so frames
+        # never pile up in the Qt event queue
+        self.frame_consumed = threading.Event()
+        self.frame_consumed.set()
+
+    def run(self):
+        self.running = True
+        while self.running:
+            if not self.frame_consumed.wait(timeout=0.1):
+                continue
+
+            frame = self.grabber.get_latest(timeout=0.1)
+            if frame is None:
+                continue
+
+            self._flip_buf = _reuse_buffer(self._flip_buf, frame.shape)
+            frame = cv2.flip(frame, 1, dst=self._flip_buf)  # Mirror the image
+            frame_id = next(_frame_ids)
+
+            results = None
+            detections = None
+            presence = None
+            if self.detection_active:
+                self._rgb_buf = _reuse_buffer(self._rgb_buf, frame.shape)
+                rgb_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB, dst=self._rgb_buf)
+                
+                mesh_future = None
+                if self._last_results is None or self._frame_idx % self.mesh_interval == 0:
+                    mesh_future = self._mesh_executor.submit(self._run_face_mesh, rgb_frame)
+                    
+                detections = self._count_faces(rgb_frame, frame_id)
+                self._frame_idx += 1
+                
+                if mesh_future is not None:
+                    results = mesh_future.result()
+                    if results is None:
+                        continue
+                    self._last_results = results
+                else:
+                    results = self._last_results
+                    
+                # Only needed when face mesh lost the face and the GUI does
+                # not stop at the multiple-faces check first
+                if not results.multi_face_landmarks and not (detections and len(detections) > 1):
+                    presence = self._check_presence(rgb_frame, frame_id)
+            else:
+                self._last_results = None
+
+            self.frame_consumed.clear()
+            self.frame_ready.emit(frame, results, detections, presence)
+
+    def _count_faces(self, rgb_frame, frame_id):
+        """Run the face detector on the RGB frame"""
+        if self.face_detector is None:
+            return None
+        try:
+            return self.face_detector.detect_faces_rgb(rgb_frame, frame_id)
+        except Exception as e:
+            print(f"Error running face detection: {e}")
+            return None
+
+    def _check_presence(self, rgb_frame, frame_id):
+        """Run the face presence check on the RGB frame"""
+        if self.presence_detector is None:
+            return None
+        try:
+            return self.presence_detector.check_face_presence_rgb(rgb_frame, frame_id)
+        except Exception as e:
+            print(f"Error checking face presence: {e}")
+            return None
+
+    def _run_face_mesh(self, rgb_frame):
+        """Run face mesh on a downscaled copy of the RGB frame"""
+        if self.inference_scale != 1.0:
+            h, w = rgb_frame.shape[:2]
+            small_size = (round(w * self.inference_scale), round(h * self.inference_scale))
+            self._small_buf = _reuse_buffer(self._small_buf, (small_size[1], small_size[0], 3))
+            rgb_frame = cv2.resize(rgb_frame, small_size, dst=self._small_buf,
+                                   interpolation=cv2.INTER_AREA)
+        # Read-only input lets MediaPipe use the buffer without copying it
+        rgb_frame.flags.writeable = False
+        try:
+            return self.face_mesh.process(rgb_frame)
+        except Exception as e:
+            print(f"Error running face mesh: {e}")
+            return None
+        finally:
+            # The buffer is written again on the next frame
+            rgb_frame.flags.writeable = True
+
+    def stop(self):
+        """Stop the worker and wait for the current frame to finish"""
+        self.running = False
+        self.wait(1000)
+        self._mesh_executor.shutdown(wait=True)
@@ -1,17 +1,25 @@
 import cv2
 import mediapipe as mp
 import numpy as np
+from utils._mp_singletons import downscale_for_detection, get_face_detector
 
 class MultipleFaceDetector:
-    def __init__(self, confidence_threshold=0.5):
+    def __init__(self, confidence_threshold=0.5, detection_interval=1):
         """
         Initialize the Multiple Face Detector.
         
         Args:
             confidence_threshold (float): Minimum confidence for face detection
+            detection_interval (int): Run detection on every Nth frame and reuse
+                the last detections in between (face count changes slowly)
         """
+        self.detection_interval = detection_interval
+        self._frame_i = 0
+        self._last_detections = None
+        
+        # Shared with FacePresenceDetector when the settings match
         self.mp_face_detection = mp.solutions.face_detection
-        self.face_detection = self.mp_face_detection.FaceDetection(
+        self.face_detection = get_face_detector(
             model_selection=0,  # Short-range model for webcam
             min_detection_confidence=confidence_threshold
         )
@@ -27,22 +35,71 @@ class MultipleFaceDetector:
         Returns:
             str or None: "Multiple Persons Detected" if more than one face found, None otherwise
         """
+        if len(self.detect_faces(image)) > 1:
+            return "Multiple Persons Detected"
+        
+        return None
+    
+    def check_multiple_faces_rgb(self, rgb_image, frame_id=None):
+        """
+        Check if multiple faces are present in an RGB image.
+        
+        Args:
+            rgb_image (numpy.ndarray): RGB image, shared with other detectors
+            frame_id (int): Frame identifier, lets detectors share one inference per frame
+            
+        Returns:
+            str or None: "Multiple Persons Detected" if more than one face found, None otherwise
+        """
+        if len(self.detect_faces_rgb(rgb_image, frame_id)) > 1:
+            return "Multiple Persons Detected"
+        
+        return None
+    
+    def detect_faces(self, image):
+        """
+        Run face detection on the image.
+        
+        Args:
+            image (numpy.ndarray): Input image from camera
+            
+        Returns:
+            list: MediaPipe face detections (empty if no face found)
+        """
         if image is None:
-            return None
+            return []
             
-        # Convert BGR to RGB for MediaPipe
-        rgb_image = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
+        # Shrink before converting BGR to RGB for MediaPipe
+        return self.detect_faces_rgb(cv2.cvtColor(downscale_for_detection(image), cv2.COLOR_BGR2RGB))
+    
+    def detect_faces_rgb(self, rgb_image, frame_id=None):
+        """
+        Run face detection on an image that is already RGB.
         
+        Args:
+            rgb_image (numpy.ndarray): RGB image, shared with other detectors
+            frame_id (int): Frame identifier, lets detectors share one inference per frame
+            
+        Returns:
+            list: MediaPipe face detections (empty if no face found)
+        """
+        if rgb_image is None:
+            return []
+            
+        self._frame_i += 1
+        if self._last_detections is not None and self._frame_i % self.detection_interval:
+            return self._last_detections
+            
         # Process the image
-        results = self.face_detection.process(rgb_image)
+        results = self.face_detection.process(rgb_image, frame_id)
         
-        # Count faces
-        if results.detections:
-            num_faces = len(results.detections)
-            if num_faces > 1:
-                return "Multiple Persons Detected"
+        self._last_detections = list(results.detections) if results.detections else []
+        return self._last_detections
         
-        return None
+    def reset(self):
+        """Forget cached detections so the next frame is processed"""
+        self._frame_i = 0
+        self._last_detections = None
     
     def process_multiple_faces(self, image, face_landmarks_list):
         """
@@ -60,18 +117,16 @@ class MultipleFaceDetector:
             h, w = image.shape[:2]
             
             for i, face_landmarks in enumerate(face_landmarks_list):
-                # Get bounding box for each face
-                landmarks = []
-                for landmark in face_landmarks.landmark:
-                    x = int(landmark.x * w)
-                    y = int(landmark.y * h)
-                    landmarks.append([x, y])
+                # Get pixel coordinates for each face as an (N, 2) array
+                face_points = face_landmarks.landmark
+                normalized = np.fromiter(
+                    (c for landmark in face_points for c in (landmark.x, landmark.y)),
+                    dtype=np.float32, count=2 * len(face_points)).reshape(-1, 2)
+                landmarks = (normalized * np.array([w, h], dtype=np.float32)).astype(np.int32)
                 
                 # Calculate bounding box
-                x_coords = [p[0] for p in landmarks]
-                y_coords = [p[1] for p in landmarks]
-                x_min, y_min = min(x_coords), min(y_coords)
-                x_max, y_max = max(x_coords), max(y_coords)
+                x_min, y_min = landmarks.min(axis=0).tolist()
+                x_max, y_max = landmarks.max(axis=0).tolist()
                 
                 # Draw red bounding box for multiple faces
                 cv2.rectangle(image, (x_min, y_min), (x_max, y_max), (0, 0, 255), 3)
@@ -85,6 +140,46 @@ class MultipleFaceDetector:
                        cv2.FONT_HERSHEY_SIMPLEX, 1.0, (0, 0, 255), 3)
         
         return image
+    
+    def draw_face_detections(self, image, detections):
+        """
+        Draw bounding boxes for face detections returned by detect_faces.
+        
+        Args:
+            image (numpy.ndarray): Input image
+            detections (list): MediaPipe face detections
+            
+        Returns:
+            numpy.ndarray: Image with face detection annotations
+        """
+        h, w = image.shape[:2]
+        
+        for i, detection in enumerate(detections):
+            box = detection.location_data.relative_bounding_box
+            x_min, y_min = int(box.xmin * w), int(box.ymin * h)
+            x_max, y_max = int((box.xmin + box.width) * w), int((box.ymin + box.height) * h)
+            
+            # Draw red bounding box for multiple faces
+            cv2.rectangle(image, (x_min, y_min), (x_max, y_max), (0, 0, 255), 3)
+            
+            # Add face number label
+            cv2.putText(image, f"Person {i+1}", (x_min, y_min - 10),
+                       cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 0, 255), 2)
+        
+        # Add warning text
+        cv2.putText(image, "MULTIPLE PERSONS DETECTED!", (10, 70),
+                   cv2.FONT_HERSHEY_SIMPLEX, 1.0, (0, 0, 255), 3)
+        
+        return image
+
+_DETECTOR = None
+
+def _get_detector():
+    """Lazily create the detector shared by the standalone functions"""
+    global _DETECTOR
+    if _DETECTOR is None:
+        _DETECTOR = MultipleFaceDetector()
+    return _DETECTOR
 
 def check_multiple_faces(image):
     """
@@ -96,5 +191,4 @@ def check_multiple_faces(image):
     Returns:
         str or None: "Multiple Persons Detected" if more than one face found, None otherwise
     """
-    detector = MultipleFaceDetector()
-    return detector.check_multiple_faces(image)
\ No newline at end of file
+    return _get_detector().check_multiple_faces(image)
\ No newline at end of file
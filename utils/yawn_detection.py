@@ -1,86 +1,191 @@
+import logging
+import math
 import numpy as np
 import cv2
+from utils._jit import njit
+
+# Yawn events are per-frame diagnostics, so they go to a debug logger rather
+# than stdout; formatting only happens when the level is enabled
+logger = logging.getLogger(__name__)
+
+# MediaPipe face mesh landmark indices for mouth, in contour order. The inner
+# lip list repeats 318, 324 and 308 from the outer lip; only the first
+# occurrence is kept so each point is gathered and drawn once
+MOUTH_IDX = np.array(list(dict.fromkeys([
+    # Outer lip landmarks
+    61, 84, 17, 314, 405, 320, 307, 375, 321, 308, 324, 318,
+    # Inner lip landmarks
+    78, 95, 88, 178, 87, 14, 317, 402, 318, 324, 308, 415
+])), dtype=np.int32)
+
+# Key points for MAR calculation. 18 and 175 sit below the lower lip (175 on
+# the chin), so the vertical pairs also span the lower lip; mar_threshold and
+# the intensity tables are calibrated on exactly these points
+MOUTH_MAR_IDX = np.array([
+    13, 14,    # Top lip center points
+    78, 308,   # Left and right mouth corners
+    18, 175    # Bottom lip center points
+], dtype=np.int32)
+
+# Yawn intensity for MAR up to and including each threshold - CALIBRATED
+# (searchsorted index = number of thresholds the MAR has exceeded)
+YAWN_INTENSITY_THRESHOLDS = np.array([0.25, 0.4, 0.55, 0.7, 0.9])
+YAWN_INTENSITIES = np.array([0, 20, 40, 60, 80, 100])
+
+# Mouth status when not yawning, for MAR above each threshold
+MOUTH_STATUS_THRESHOLDS = np.array([0.25, 0.35, 0.5])
+MOUTH_STATUSES = ("Closed", "Slightly Open", "Open", "Wide Open")
+
+# MAR above which the mouth counts as open - reduced from 0.5 for better sensitivity
+MOUTH_OPEN_THRESHOLD = 0.4
+
+@njit(cache=True, fastmath=True)
+def _squared_distance(landmarks, a, b):
+    """Squared Euclidean distance between landmarks a and b of an (N, 2) array"""
+    dx = float(landmarks[a, 0]) - float(landmarks[b, 0])
+    dy = float(landmarks[a, 1]) - float(landmarks[b, 1])
+    return dx * dx + dy * dy
+
+@njit(cache=True, fastmath=True)
+def _mouth_aspect_ratio(landmarks, mouth_idx):
+    """MAR = (|p1-p5| + |p2-p6|) / (2 * |p3-p4|) for the 6 mouth points at mouth_idx, -1.0 if the mouth is too narrow"""
+    # Check the width on squared distances (|p3-p4| <= 1 iff |p3-p4|^2 <= 1)
+    # so a degenerate mouth returns before any sqrt is taken
+    horizontal_sq = _squared_distance(landmarks, mouth_idx[2], mouth_idx[3])  # Left to right corner
+    if horizontal_sq <= 1.0:
+        return -1.0
+    
+    vertical_dist1 = math.sqrt(_squared_distance(landmarks, mouth_idx[0], mouth_idx[4]))  # Top center to bottom center
+    vertical_dist2 = math.sqrt(_squared_distance(landmarks, mouth_idx[1], mouth_idx[5]))  # Another vertical pair
+    return (vertical_dist1 + vertical_dist2) / (2.0 * math.sqrt(horizontal_sq))
+
+# Events reported by _yawn_step, as bit flags
+YAWN_STARTED = 1
+YAWN_ENDED = 2
+YAWN_RESET = 4
+
+# Slots of the yawn state vector
+_FRAME_COUNT = 0
+_STABLE_COUNT = 1
+_IS_YAWNING = 2
+
+@njit(cache=True)
+def _yawn_step(state, mar_above_threshold, consecutive_frames, stable_threshold, max_duration):
+    """Advance the yawn state vector by one frame in place, returning the events it triggered"""
+    events = 0
+    if mar_above_threshold:
+        state[_FRAME_COUNT] += 1
+        state[_STABLE_COUNT] += 1
+        
+        # Confirm yawning after consecutive frames AND stability check
+        if (state[_FRAME_COUNT] >= consecutive_frames and
+                state[_STABLE_COUNT] >= stable_threshold and not state[_IS_YAWNING]):
+            state[_IS_YAWNING] = 1
+            events |= YAWN_STARTED
+    else:
+        # End of yawn
+        if state[_IS_YAWNING] and state[_FRAME_COUNT] > 0:
+            state[_IS_YAWNING] = 0
+            events |= YAWN_ENDED
+        state[_FRAME_COUNT] = 0
+        state[_STABLE_COUNT] = 0
+        
+    # Prevent extremely long yawn detection (likely false positive)
+    if state[_FRAME_COUNT] > max_duration:
+        state[:] = 0
+        events |= YAWN_RESET
+        
+    return events
 
 class YawnDetector:
     def __init__(self):
         # MediaPipe face mesh landmark indices for mouth
-        self.mouth_landmarks = [
-            # Outer lip landmarks
-            61, 84, 17, 314, 405, 320, 307, 375, 321, 308, 324, 318,
-            # Inner lip landmarks  
-            78, 95, 88, 178, 87, 14, 317, 402, 318, 324, 308, 415
-        ]
+        self.mouth_landmarks = MOUTH_IDX
         
         # Key points for MAR calculation - FIXED landmark indices
-        self.mouth_points = [
-            13, 14,    # Top lip center points
-            78, 308,   # Left and right mouth corners  
-            18, 175    # Bottom lip center points
-        ]
+        self.mouth_points = MOUTH_MAR_IDX
+        
+        # Highest index of each set, so one comparison tells whether every
+        # point is present in a landmark array
+        self._max_contour_idx = int(self.mouth_landmarks.max())
+        self._max_point_idx = int(self.mouth_points.max())
+        
+        # Reused contour buffer, so drawing a full face allocates nothing
+        self._poly_buf = np.empty((len(MOUTH_IDX), 2), dtype=np.int32)
         
         # MAR thresholds and parameters - ADJUSTED for better accuracy
         self.mar_threshold = 0.65  # Reduced from 0.7 for better sensitivity
         self.yawn_consecutive_frames = 4  # Increased from 3 for stability
         self.max_yawn_duration = 45  # Increased from 30 for longer yawns
         
-        # State tracking
-        self.mar_history = []
-        self.yawn_frame_count = 0
-        self.is_yawning = False
+        # State tracking: MAR smoothing window as a ring buffer with a running sum
+        self._mar_ring = np.zeros(10)  # Keep last 10 values for smoothing
+        self._ring_idx = 0
+        self._ring_count = 0
+        self._ring_sum = 0.0
+        # Frame count, stable count and yawning flag in one contiguous
+        # vector, stepped in place by the compiled _yawn_step
+        self._yawn_state = np.zeros(3, dtype=np.int32)
         self.yawn_start_time = None
         self.last_mar = 0.0
+        self._last_intensity = 0  # Intensity of last_mar, updated with it
         self.yawn_events = []
+        # Per-event columns kept alongside yawn_events for vectorised statistics
+        self._event_max_mars = []
+        self._event_durations = []
         
         # NEW: Stability tracking to prevent false positives
-        self.stable_yawn_count = 0
         self.stable_threshold = 3
+        self._false_positive_resets = 0  # Yawns cut off for exceeding max_yawn_duration
+        
+        # Compile the kernels now rather than on the first camera frame
+        _mouth_aspect_ratio(np.zeros((478, 2), dtype=np.int32), self.mouth_points)
+        _yawn_step(np.zeros(3, dtype=np.int32), False, self.yawn_consecutive_frames,
+                   self.stable_threshold, self.max_yawn_duration)
+        
+    @property
+    def yawn_frame_count(self):
+        return int(self._yawn_state[_FRAME_COUNT])
+        
+    @property
+    def stable_yawn_count(self):
+        return int(self._yawn_state[_STABLE_COUNT])
+        
+    @property
+    def is_yawning(self):
+        return bool(self._yawn_state[_IS_YAWNING])
         
     def calculate_mar(self, landmarks):
-        """Calculate Mouth Aspect Ratio (MAR) from facial landmarks - IMPROVED"""
-        try:
-            # Get mouth coordinates with better error handling
-            mouth_coords = []
-            for point_idx in self.mouth_points:
-                if point_idx < len(landmarks):
-                    mouth_coords.append(landmarks[point_idx])
-                else:
-                    # Return previous MAR if landmarks are missing
-                    return self.last_mar
-                    
-            if len(mouth_coords) < 6:
-                return self.last_mar
-                
-            mouth_coords = np.array(mouth_coords)
-            
-            # IMPROVED MAR calculation with multiple measurement points
-            # MAR = average of multiple vertical distances / horizontal distance
-            
-            # Multiple vertical distances for better accuracy
-            vertical_dist1 = np.linalg.norm(mouth_coords[0] - mouth_coords[4])  # Top center to bottom center
-            vertical_dist2 = np.linalg.norm(mouth_coords[1] - mouth_coords[5])  # Another vertical pair
+        """Calculate Mouth Aspect Ratio (MAR) from (N, 2) int32 pixel landmarks - IMPROVED"""
+        landmarks = np.asarray(landmarks)
+        # Return previous MAR if landmarks are malformed or missing (one
+        # bounds check for all points); a narrow mouth is handled below
+        if landmarks.ndim != 2 or self._max_point_idx >= len(landmarks):
+            return self.last_mar
             
-            # Horizontal distance (mouth width)
-            horizontal_dist = np.linalg.norm(mouth_coords[2] - mouth_coords[3])  # Left to right corner
+        # Points are read in place by the compiled kernel, no gather copy
+        mar = _mouth_aspect_ratio(landmarks, self.mouth_points)
+        
+        # Keep previous value if calculation seems off
+        if mar < 0.0:
+            mar = self.last_mar
             
-            # Calculate MAR with improved formula
-            if horizontal_dist > 1.0:  # Ensure reasonable horizontal distance
-                mar = (vertical_dist1 + vertical_dist2) / (2.0 * horizontal_dist)
-            else:
-                mar = self.last_mar  # Keep previous value if calculation seems off
-                
-            # SMOOTHING: Apply moving average to reduce noise
-            self.mar_history.append(mar)
-            if len(self.mar_history) > 10:  # Keep last 10 values for smoothing
-                self.mar_history.pop(0)
-                
-            # Use smoothed MAR
-            smoothed_mar = sum(self.mar_history) / len(self.mar_history)
-            self.last_mar = smoothed_mar
-            return smoothed_mar
+        # SMOOTHING: Apply moving average to reduce noise
+        ring = self._mar_ring
+        self._ring_sum += mar - ring.item(self._ring_idx)
+        ring[self._ring_idx] = mar
+        self._ring_idx = (self._ring_idx + 1) % len(ring)
+        if self._ring_count < len(ring):
+            self._ring_count += 1
+        elif self._ring_idx == 0:
+            # Resum once per lap so rounding error cannot accumulate
+            self._ring_sum = float(ring.sum())
             
-        except Exception as e:
-            print(f"Error calculating MAR: {e}")
-            return self.last_mar
+        # Use smoothed MAR
+        smoothed_mar = self._ring_sum / self._ring_count
+        self.last_mar = smoothed_mar
+        self._last_intensity = self.get_yawn_intensity(smoothed_mar)
+        return smoothed_mar
             
     def detect_yawn(self, mar=None, head_turned_away=False):
         """Detect yawn with head turn consideration - FIXED LOGIC"""
@@ -91,149 +196,123 @@ class YawnDetector:
         # This prevents false yawn detection when head movement affects mouth landmarks
         if head_turned_away:
             # Reset yawn detection when head is turned away
-            self.yawn_frame_count = 0
-            if self.is_yawning:
-                self.is_yawning = False
-                print("Yawn detection stopped due to head turn")
+            state = self._yawn_state
+            state[_FRAME_COUNT] = 0
+            if state[_IS_YAWNING]:
+                state[_IS_YAWNING] = 0
+                logger.debug("Yawn detection stopped due to head turn")
             return False
             
-        # Check if MAR exceeds threshold
-        if mar > self.mar_threshold:
-            self.yawn_frame_count += 1
-            self.stable_yawn_count += 1
-            
-            # Confirm yawning after consecutive frames AND stability check
-            if (self.yawn_frame_count >= self.yawn_consecutive_frames and 
-                self.stable_yawn_count >= self.stable_threshold and 
-                not self.is_yawning):
-                
-                self.is_yawning = True
-                self.yawn_start_time = len(self.mar_history)
-                self.yawn_events.append({
-                    'start_frame': len(self.mar_history),
-                    'max_mar': mar,
-                    'duration': 0
-                })
-                print(f"Yawn detected! MAR: {mar:.3f}")
-                
-        else:
-            # End of yawn - IMPROVED logic
-            if self.is_yawning and self.yawn_frame_count > 0:
-                self.is_yawning = False
-                duration = self.yawn_frame_count
-                if self.yawn_events:
-                    self.yawn_events[-1]['duration'] = duration
-                print(f"Yawn ended. Duration: {duration} frames")
-                
-            # Reset counters
-            self.yawn_frame_count = 0
-            self.stable_yawn_count = 0
-            
-        # Prevent extremely long yawn detection (likely false positive)
-        if self.yawn_frame_count > self.max_yawn_duration:
-            self.is_yawning = False
-            self.yawn_frame_count = 0
-            self.stable_yawn_count = 0
-            print("Long yawn detection reset - likely false positive")
+        # Counter logic runs compiled; events and logging stay in Python
+        duration = self.yawn_frame_count
+        events = _yawn_step(self._yawn_state, mar > self.mar_threshold,
+                            self.yawn_consecutive_frames, self.stable_threshold,
+                            self.max_yawn_duration)
+        
+        if events & YAWN_STARTED:
+            self.yawn_start_time = self._ring_count
+            self.yawn_events.append({
+                'start_frame': self._ring_count,
+                'max_mar': mar,
+                'duration': 0
+            })
+            self._event_max_mars.append(float(mar))
+            self._event_durations.append(0)
+            logger.debug("Yawn detected MAR=%.3f", mar)
+        if events & YAWN_ENDED:
+            if self.yawn_events:
+                self.yawn_events[-1]['duration'] = duration
+                self._event_durations[-1] = duration
+            logger.debug("Yawn ended, duration %d frames", duration)
+        if events & YAWN_RESET:
+            # Likely false positive; counted rather than reported every time
+            self._false_positive_resets += 1
             
         return self.is_yawning
         
     def get_yawn_intensity(self, mar=None):
         """Get yawn intensity as a percentage - CALIBRATED"""
         if mar is None:
-            mar = self.last_mar
+            # Already looked up when last_mar was set
+            return self._last_intensity
             
-        if mar <= 0.25:
-            return 0  # No yawn
-        elif mar <= 0.4:
-            return 20  # Slight mouth opening
-        elif mar <= 0.55:
-            return 40  # Moderate opening  
-        elif mar <= 0.7:
-            return 60  # Strong yawn
-        elif mar <= 0.9:
-            return 80  # Very strong yawn
-        else:
-            return 100  # Extreme yawn
+        # No yawn, slight opening, moderate opening, strong, very strong, extreme
+        return YAWN_INTENSITIES.item(np.searchsorted(YAWN_INTENSITY_THRESHOLDS, mar))
             
     def get_average_mar(self):
         """Get average MAR from recent history"""
-        if not self.mar_history:
+        if not self._ring_count:
             return 0.0
-        return sum(self.mar_history) / len(self.mar_history)
+        return self._ring_sum / self._ring_count
         
     def draw_mouth_contour(self, frame, landmarks):
-        """Draw mouth contour on the frame - ENHANCED"""
-        try:
-            mouth_coords = []
-            for idx in self.mouth_landmarks:
-                if idx < len(landmarks):
-                    mouth_coords.append(landmarks[idx])
-                    
-            if len(mouth_coords) > 3:
-                mouth_coords = np.array(mouth_coords, dtype=np.int32)
+        """Draw mouth contour on the frame from (N, 2) int32 pixel landmarks - ENHANCED"""
+        landmarks = np.asarray(landmarks)
+        if landmarks.ndim != 2:
+            return
+        num_landmarks = len(landmarks)
+        
+        mouth_idx = self.mouth_landmarks
+        if landmarks.dtype == np.int32 and self._max_contour_idx < num_landmarks:
+            # Gather straight into the reused buffer
+            mouth_coords = np.take(landmarks, mouth_idx, axis=0, out=self._poly_buf)
+        else:
+            mouth_coords = landmarks[mouth_idx[mouth_idx < num_landmarks]].astype(np.int32, copy=False)
                 
-                # ENHANCED: Color coding based on yawn intensity
-                intensity = self.get_yawn_intensity()
-                if self.is_yawning:
-                    if intensity >= 80:
-                        color = (0, 0, 255)  # Red for strong yawn
-                    elif intensity >= 60:
-                        color = (0, 165, 255)  # Orange for moderate yawn
-                    else:
-                        color = (0, 255, 255)  # Yellow for mild yawn
-                    thickness = 3
+        if len(mouth_coords) > 3:
+            # ENHANCED: Color coding based on yawn intensity
+            intensity = self.get_yawn_intensity()
+            if self.is_yawning:
+                if intensity >= 80:
+                    color = (0, 0, 255)  # Red for strong yawn
+                elif intensity >= 60:
+                    color = (0, 165, 255)  # Orange for moderate yawn
                 else:
-                    color = (255, 0, 0)  # Blue for normal
-                    thickness = 1
-                    
-                cv2.polylines(frame, [mouth_coords], True, color, thickness)
+                    color = (0, 255, 255)  # Yellow for mild yawn
+                thickness = 3
+            else:
+                color = (255, 0, 0)  # Blue for normal
+                thickness = 1
                 
-                # Draw key points with different colors
-                for i, point_idx in enumerate(self.mouth_points):
-                    if point_idx < len(landmarks):
-                        point_color = (0, 255, 255) if self.is_yawning else (255, 255, 0)
-                        cv2.circle(frame, tuple(landmarks[point_idx]), 2, point_color, -1)
-                        
-        except Exception as e:
-            print(f"Error drawing mouth contour: {e}")
+            cv2.polylines(frame, [mouth_coords], True, color, thickness)
+            
+            # Draw key points with different colors
+            point_color = (0, 255, 255) if self.is_yawning else (255, 255, 0)
+            key_idx = self.mouth_points
+            if self._max_point_idx >= num_landmarks:
+                key_idx = key_idx[key_idx < num_landmarks]
+            key_points = landmarks[key_idx]
+            for x, y in key_points.astype(np.int32, copy=False).tolist():
+                cv2.circle(frame, (x, y), 2, point_color, -1)
             
     def is_mouth_open(self, mar=None):
         """Check if mouth is significantly open - ADJUSTED threshold"""
         if mar is None:
             mar = self.last_mar
-        return mar > 0.4  # Reduced from 0.5 for better sensitivity
+        return mar > MOUTH_OPEN_THRESHOLD
         
     def get_mouth_status(self):
         """Get current mouth status as a string - ENHANCED"""
-        mar = self.last_mar
-        
         if self.is_yawning:
             intensity = self.get_yawn_intensity()
-            if intensity >= 80:
-                return "Strong Yawn"
-            elif intensity >= 60:
-                return "Moderate Yawn"
-            else:
-                return "Mild Yawn"
-        elif mar > 0.5:
-            return "Wide Open"
-        elif mar > 0.35:
-            return "Open"
-        elif mar > 0.25:
-            return "Slightly Open"
-        else:
-            return "Closed"
+            return "Strong Yawn" if intensity >= 80 else "Moderate Yawn" if intensity >= 60 else "Mild Yawn"
+            
+        return MOUTH_STATUSES[np.searchsorted(MOUTH_STATUS_THRESHOLDS, self.last_mar)]
             
     def reset_state(self):
         """Reset the yawn detector state"""
-        self.mar_history.clear()
-        self.yawn_frame_count = 0
-        self.is_yawning = False
+        self._mar_ring.fill(0.0)
+        self._ring_idx = 0
+        self._ring_count = 0
+        self._ring_sum = 0.0
+        self._yawn_state.fill(0)
         self.yawn_start_time = None
         self.last_mar = 0.0
+        self._last_intensity = 0
         self.yawn_events.clear()
-        self.stable_yawn_count = 0
+        self._event_max_mars.clear()
+        self._event_durations.clear()
+        self._false_positive_resets = 0
         
     def get_yawn_statistics(self):
         """Get statistics about yawning events"""
@@ -242,22 +321,26 @@ class YawnDetector:
                 'total_yawns': 0,
                 'average_duration': 0,
                 'max_mar': 0,
-                'average_intensity': 0
+                'average_intensity': 0,
+                'false_positive_resets': self._false_positive_resets
             }
             
         total_yawns = len(self.yawn_events)
-        durations = [event['duration'] for event in self.yawn_events if event['duration'] > 0]
-        avg_duration = sum(durations) / len(durations) if durations else 0
-        max_mar = max([event['max_mar'] for event in self.yawn_events])
+        durations = np.asarray(self._event_durations)
+        durations = durations[durations > 0]
+        avg_duration = float(durations.mean()) if len(durations) else 0
+        max_mars = np.asarray(self._event_max_mars)
+        max_mar = float(max_mars.max())
         
-        # Calculate average intensity
-        avg_intensity = sum([self.get_yawn_intensity(event['max_mar']) for event in self.yawn_events]) / total_yawns
+        # Calculate average intensity over all events in one lookup
+        avg_intensity = float(YAWN_INTENSITIES[np.searchsorted(YAWN_INTENSITY_THRESHOLDS, max_mars)].mean())
         
         return {
             'total_yawns': total_yawns,
             'average_duration': avg_duration,
             'max_mar': max_mar,
             'average_intensity': avg_intensity,
+            'false_positive_resets': self._false_positive_resets,
             'recent_yawns': self.yawn_events[-5:]  # Last 5 yawn events
         }
         